@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LittleLemon.settings')
+os.environ.setdefault('LITTLELEMON_ASGI', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from LittleLemonAPI.middleware import DisconnectWatcher  # noqa: E402, needs the apps loaded
+
+# lets the order event streams stop when their client disconnects
+application = DisconnectWatcher(django_application)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LittleLemonAPI.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,17 +59,17 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'LittleLemonAPI.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
         'rest_framework_xml.renderers.XMLRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'LittleLemonAPI.throttling.AnonRateThrottle',
+        'LittleLemonAPI.throttling.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '2/minute',
@@ -75,6 +77,32 @@ REST_FRAMEWORK = {
     },
 }
 
+# Serialized menu pages/items kept by LittleLemonAPI.cache, keyed by catalog version
+CATALOG_CACHE_MAX_ENTRIES = 1024
+
+# Seconds a user's roles are cached per process. Role changes made in another
+# worker take effect here only once this runs out, so keep it short
+ROLES_CACHE_TIMEOUT = 5
+
+# In-process token -> user cache used by CachedTokenAuthentication. Logouts
+# and deactivations in another worker reach this one only once an entry runs
+# out, so like ROLES_CACHE_TIMEOUT keep the TTL (seconds) short
+TOKEN_CACHE_MAX_ENTRIES = 10000
+TOKEN_CACHE_TTL = 5
+
+# Stored first responses for retried POSTs with an Idempotency-Key header
+# (LittleLemonAPI.idempotency): kept for IDEMPOTENCY_KEY_TTL seconds, at most
+# IDEMPOTENCY_MAX_KEYS of them
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_MAX_KEYS = 100000
+
+# Delivered orders older than this many days are moved to the order archive
+# by the archive_orders command (LittleLemonAPI.archive)
+ORDER_ARCHIVE_DAYS = 90
+
+# SQLite file holding the throttle buckets shared by all workers on this host
+THROTTLE_DB_PATH = BASE_DIR / 'throttle.sqlite3'
+
 DJOSER = {
     'USER_ID_FIELD': 'username',
     'LOGIN_FIELD': 'username',
@@ -100,17 +128,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'LittleLemon.wsgi.application'
 
+# Serve /api/orders/<pk>/events; LittleLemon/asgi.py turns this on for ASGI
+# workers (a WSGI worker would be held for as long as a stream stays open)
+ORDER_EVENTS = os.environ.get('LITTLELEMON_ASGI') == '1'
+
+# Serve GETs on the menu, category and order listings with async views under
+# ASGI. Opt-in: with SQLite, manage.py benchmark_asgi still measures them
+# slower than the sync views
+ASYNC_READ_VIEWS = os.environ.get('LITTLELEMON_ASYNC_VIEWS') == '1'
+
+# Seconds an order's event stream (/api/orders/<pk>/events) stays open; the
+# client's EventSource then reconnects
+ORDER_EVENTS_MAX_AGE = 300
+
+# Per-request SQL/serializer/render timings as a Server-Timing header, and a
+# log line for requests slower than SLOW_REQUEST_MS (LittleLemonAPI.middleware)
+REQUEST_METRICS = os.environ.get('LITTLELEMON_REQUEST_METRICS') == '1'
+SLOW_REQUEST_MS = 500
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 plus WAL and tuning pragmas, see LittleLemonAPI/backends
+        'ENGINE': 'LittleLemonAPI.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # keep connections open across requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        # a file (not shared-cache memory) so concurrency tests get real SQLite locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    # the same file opened read-only, for safe requests on catalog and order
+    # listings (see LittleLemonAPI.routers); WAL lets it read during writes
+    'replica': {
+        'ENGINE': 'LittleLemonAPI.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pragmas': {'journal_mode': None}},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['LittleLemonAPI.routers.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
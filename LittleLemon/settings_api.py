@@ -0,0 +1,39 @@
+"""
+API-only settings for workers that serve token-authenticated JSON and nothing
+else. Everything in LittleLemon.settings applies except that the admin,
+sessions, messages, static files, templates, the browsable API and the XML
+renderer are left out, so workers import and hold less.
+
+Select it with DJANGO_SETTINGS_MODULE=LittleLemon.settings_api; compare it
+with the full profile using `manage.py measure_startup`.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework.authtoken',
+    'djoser',
+    'LittleLemonAPI',
+]
+
+MIDDLEWARE = [
+    'LittleLemonAPI.middleware.RequestMetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        'LittleLemonAPI.renderers.JSONRenderer',
+    ],
+    # no sessions to authenticate with
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
+    ],
+}
@@ -14,13 +14,27 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
+from django.conf import settings
 from django.urls import path, include
 
+# ASGI workers add the order event streams, and with ASYNC_READ_VIEWS serve
+# the read endpoints with native async views
+if settings.ASYNC_READ_VIEWS:
+    api_urls = 'LittleLemonAPI.async_urls'
+elif settings.ORDER_EVENTS:
+    api_urls = 'LittleLemonAPI.asgi_urls'
+else:
+    api_urls = 'LittleLemonAPI.urls'
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     path('token/login/', include('djoser.urls.authtoken')),
-    path('api/', include('LittleLemonAPI.urls')),
+    path('api/', include(api_urls)),
 ]
+
+# the API-only profile (LittleLemon.settings_api) leaves the admin out
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,74 @@
+from contextvars import ContextVar
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Order, OrderItem, ArchivedOrder, MenuItem
+from .rows import user_rows, menu_item, decimal, MENU_ITEM_FIELDS
+
+# Delivered orders older than ORDER_ARCHIVE_DAYS move from Order/OrderItem to
+# ArchivedOrder, one row per order, so the live tables only hold recent and
+# open orders. Archived orders stay counted in the sales rollups.
+
+# True while archive_batch() deletes the orders it has just archived
+archiving = ContextVar('littlelemon_archiving', default=False)
+
+
+def archivable(days):
+    cutoff = timezone.now().date() - timedelta(days=days)
+    return Order.objects.filter(status=True, date__lt=cutoff)
+
+
+def archive_batch(days, batch_size):
+    """
+    Move up to batch_size archivable orders, oldest id first, in one short
+    transaction. Returns the number moved; 0 once there are none left. Every
+    batch is complete or not there at all, so an interrupted run simply
+    starts again from what is still live.
+    """
+    with transaction.atomic():
+        orders = list(archivable(days).order_by('id').values_list('id', 'user_id', 'delivery_crew_id', 'status', 'total', 'date')[:batch_size])
+        if not orders:
+            return 0
+        items = {order[0]: [] for order in orders}
+        for order_id, pk, menuitem_id, quantity, unit_price, total in (
+            OrderItem.objects.filter(order__in=items).order_by('id').values_list('order_id', 'id', 'menuitem_id', 'quantity', 'unit_price', 'total')
+        ):
+            items[order_id].append([pk, menuitem_id, quantity, decimal(unit_price), decimal(total)])
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(id=pk, user_id=user_id, delivery_crew_id=crew_id, status=stts, total=total, date=date, items=items[pk])
+            for pk, user_id, crew_id, stts, total, date in orders
+        ])
+        token = archiving.set(True)
+        try:
+            # the cascade takes the order items
+            Order.objects.filter(id__in=items).delete()
+        finally:
+            archiving.reset(token)
+    return len(orders)
+
+
+def archived_order_detail(pk):
+    """
+    The (user id, body) /api/orders/<pk> answers for an archived order, shaped
+    like the live one, or None. Lines whose menu item has since been deleted
+    have a null menuitem.
+    """
+    order = ArchivedOrder.objects.filter(id=pk).values_list('id', 'user_id', 'delivery_crew_id', 'status', 'total', 'date', 'items').first()
+    if order is None:
+        return None
+    pk, user_id, crew_id, stts, total, date, items = order
+    users = user_rows({user_id} | ({crew_id} if crew_id is not None else set()))
+    menu_items = {row[0]: menu_item(*row) for row in MenuItem.objects.filter(id__in=[item[1] for item in items]).values_list(*MENU_ITEM_FIELDS)}
+    order = {
+        'id': pk,
+        'user': users[user_id],
+        'delivery_crew': users[crew_id] if crew_id is not None else None,
+        'status': stts,
+        'total': decimal(total),
+        'date': date.isoformat(),
+    }
+    order_items = [
+        {'id': item_id, 'order': order, 'menuitem': menu_items.get(menuitem_id), 'quantity': quantity, 'unit_price': unit_price, 'total': line_total}
+        for item_id, menuitem_id, quantity, unit_price, line_total in items
+    ]
+    return user_id, {'order': order, 'order_items': order_items}
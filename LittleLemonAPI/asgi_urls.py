@@ -0,0 +1,11 @@
+from django.urls import path
+from .urls import urlpatterns as sync_urlpatterns
+from .async_views import AsyncOrderEventsView
+
+# The API routes for ASGI workers: the regular ones plus the order event
+# streams. ASGI only, a WSGI worker would be held for as long as a stream
+# stays open.
+
+urlpatterns = sync_urlpatterns + [
+    path('orders/<int:pk>/events', AsyncOrderEventsView.as_view()),
+]
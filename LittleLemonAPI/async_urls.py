@@ -0,0 +1,30 @@
+from asgiref.sync import sync_to_async
+from django.urls import path
+from .asgi_urls import urlpatterns as asgi_urlpatterns
+from .views import CategoryView, MenuItemView, MenuItemDetailView, OrderView
+from .async_views import AsyncCategoryView, AsyncMenuItemView, AsyncMenuItemDetailView, AsyncOrderView
+
+# The ASGI routes (asgi_urls.py) with native async reads: GETs and HEADs on
+# the read endpoints go to the async views, every other method to the regular
+# DRF view in a thread.
+
+def async_reads(async_view, sync_view):
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+    # csrf_exempt() would wrap this in a sync function; DRF views are exempt anyway
+    view.csrf_exempt = True
+    return view
+
+async_routes = {
+    'categories': async_reads(AsyncCategoryView.as_view(), CategoryView.as_view()),
+    'menu-items': async_reads(AsyncMenuItemView.as_view(), MenuItemView.as_view()),
+    'menu-items/<int:pk>': async_reads(AsyncMenuItemDetailView.as_view(), MenuItemDetailView.as_view()),
+    'orders': async_reads(AsyncOrderView.as_view(), OrderView.as_view()),
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), async_routes[str(pattern.pattern)]) if str(pattern.pattern) in async_routes else pattern
+    for pattern in asgi_urlpatterns
+]
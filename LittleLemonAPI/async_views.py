@@ -0,0 +1,232 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+import json
+from django.http import Http404, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions
+from .filters import MenuItemSearchFilter, has_menu_fts
+from .instrumentation import timed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+from .authentication import CachedTokenAuthentication
+from .cache import CatalogCacheMixin
+from .models import Category, MenuItem, Order
+from .middleware import DISCONNECTED
+from .notifier import order_notifier, order_payload
+from .pagination import OrderPagination, MenuItemCursorPagination, menu_item_paginator, menu_item_page
+from .permissions import IsManager, IsCustomer, IsDeliveryCrew
+from .renderers import JSONRenderer
+from .roles import aget_roles, MANAGER
+from .routers import replica_reads
+from .throttling import UserRateThrottle, AnonRateThrottle
+from .rows import category_rows, menu_item_rows, menu_item_row, order_rows, ORDER_FIELDS
+from .views import filter_menu_items, visible_orders
+
+# Async versions of the read-only endpoints, served for GET/HEAD when
+# ASYNC_READ_VIEWS is on (see async_urls.py). They build the same rows.py rows
+# as the DRF views, so the JSON is the same; token authentication only.
+
+
+class AsyncAPIView(View):
+    """
+    A minimal async counterpart of DRF's APIView: token authentication, the
+    same permission and throttle classes, DRF exception handling and JSON
+    rendering, with every database and cache access awaited.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    renderer = JSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.request = Request(request)
+        token = replica_reads.set(True)
+        try:
+            await self.initial(request)
+            handler = getattr(self, request.method.lower(), None)
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        finally:
+            replica_reads.reset(token)
+        return self.finalize_response(request, response)
+
+    async def initial(self, request):
+        await self.perform_authentication(request)
+        # permission classes read the roles memoized on the request
+        request._littlelemon_roles = await aget_roles(request.user)
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+        for throttle in [throttle() for throttle in self.throttle_classes]:
+            if not await sync_to_async(throttle.allow_request, thread_sensitive=False)(request, self):
+                raise exceptions.Throttled(throttle.wait())
+
+    async def perform_authentication(self, request):
+        for authenticator in [auth() for auth in self.authentication_classes]:
+            user_auth = await authenticator.aauthenticate(request)
+            if user_auth is not None:
+                request.user, request.auth = user_auth
+                return
+        request.user, request.auth = AnonymousUser(), None
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication_classes[0]().authenticate_header(self.request)
+        response = exception_handler(exc, {'view': self, 'args': self.args, 'kwargs': self.kwargs, 'request': self.request})
+        if response is None:
+            raise exc
+        return response
+
+    def finalize_response(self, request, response):
+        if not isinstance(response, Response):
+            # e.g. a StreamingHttpResponse, sent as is
+            return response
+        response.accepted_renderer = self.renderer
+        response.accepted_media_type = self.renderer.media_type
+        response.renderer_context = {'view': self, 'request': request, 'response': response}
+        with timed('render'):
+            return response.render()
+
+
+class AsyncCategoryView(AsyncAPIView):
+    permission_classes = [IsAuthenticated, IsManager]
+
+    async def get(self, request):
+        with timed('serialize'):
+            data = await sync_to_async(category_rows)(Category.objects.all())
+        return Response(data)
+
+
+class AsyncMenuItemView(CatalogCacheMixin, AsyncAPIView):
+    search_fields = ['title', 'category__name']
+
+    async def get(self, request):
+        return await self.acatalog_response(request, self.list)
+
+    async def list(self):
+        request = self.request
+        queryset = filter_menu_items(request.query_params)
+        # the index check introspects the schema once per alias, off the event loop
+        await sync_to_async(has_menu_fts)(queryset.db)
+        queryset = MenuItemSearchFilter().filter_queryset(request, queryset, self)
+        if request.query_params.get('pagination') == 'cursor':
+            paginator = MenuItemCursorPagination()
+            items = await paginator.apaginate_queryset(queryset, request, self)
+            with timed('serialize'):
+                data = [menu_item_row(item) for item in items]
+            return paginator.get_paginated_response(data)
+        ordering = request.query_params.get('ordering', None)
+        if ordering:
+            queryset = queryset.order_by(*ordering.split(','))
+        page = await self.apage(queryset, request.query_params.get('perpage'), request.query_params.get('page'))
+        with timed('serialize'):
+            data = await sync_to_async(menu_item_rows)(page.object_list)
+        return Response(data)
+
+    async def apage(self, queryset, perpage, page):
+        # same page/perpage helpers as MenuItemView, with the count fetched async
+        paginator = menu_item_paginator(queryset, perpage)
+        paginator.count = await queryset.acount()
+        return menu_item_page(paginator, page)
+
+
+class AsyncMenuItemDetailView(CatalogCacheMixin, AsyncAPIView):
+    async def get(self, request, pk):
+        return await self.acatalog_response(request, lambda: self.retrieve(pk))
+
+    async def retrieve(self, pk):
+        try:
+            item = await MenuItem.objects.select_related('category').aget(pk=pk)
+        except MenuItem.DoesNotExist:
+            raise Http404
+        return Response(menu_item_row(item))
+
+
+class AsyncOrderView(AsyncAPIView):
+    permission_classes = [IsAuthenticated, (IsCustomer | IsManager | IsDeliveryCrew)]
+
+    async def get(self, request):
+        orders = visible_orders(request.user, request._littlelemon_roles)
+        paginator = OrderPagination()
+        page = await paginator.apaginate_queryset(orders.values_list(*ORDER_FIELDS), request, self)
+        with timed('serialize'):
+            data = await sync_to_async(order_rows)(page)
+        return paginator.get_paginated_response(data)
+
+
+class AsyncOrderEventsView(AsyncAPIView):
+    """
+    Server-Sent Events for one order: its current status and delivery crew,
+    then every change as it is saved, until it is delivered or deleted. Open
+    to the order's customer, its delivery crew and managers. A stream ends
+    after ORDER_EVENTS_MAX_AGE seconds, or as soon as the client disconnects;
+    a reconnecting EventSource is sent the current state again.
+    """
+    heartbeat = 15
+
+    async def get(self, request, pk):
+        # taken before the read, so a change saved in between is still sent
+        version = order_notifier.version
+        try:
+            order = await Order.objects.aget(pk=pk)
+        except Order.DoesNotExist:
+            raise Http404
+        user_id = request.user.id
+        if user_id not in (order.user_id, order.delivery_crew_id) and MANAGER not in request._littlelemon_roles:
+            raise exceptions.PermissionDenied('You are not authorized to view this order')
+        # set by DisconnectWatcher (LittleLemon/asgi.py)
+        disconnected = request.scope.get(DISCONNECTED)
+        max_age = getattr(settings, 'ORDER_EVENTS_MAX_AGE', 300)
+        response = StreamingHttpResponse(self.events(order, version, max_age, disconnected), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, order, version, max_age, disconnected):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_age
+        state = order_payload(order)
+        yield self.event(version, state)
+        while not state['status']:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            change = await self.next_change(order.id, version, min(self.heartbeat, remaining), disconnected)
+            if disconnected is not None and disconnected.is_set():
+                return
+            if change is None:
+                if loop.time() < deadline:
+                    yield ': keep-alive\n\n'
+                continue
+            version, state = change
+            if state.get('deleted'):
+                yield self.event(version, state, 'deleted')
+                return
+            yield self.event(version, state)
+
+    async def next_change(self, order_id, version, timeout, disconnected):
+        if disconnected is None:
+            return await order_notifier.wait(order_id, version, timeout)
+        # whichever comes first; cancelling the wait releases its watcher
+        change = asyncio.ensure_future(order_notifier.wait(order_id, version, timeout))
+        gone = asyncio.ensure_future(disconnected.wait())
+        try:
+            await asyncio.wait({change, gone}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            change.cancel()
+            gone.cancel()
+        return change.result() if change.done() and not change.cancelled() else None
+
+    def event(self, version, state, name='order'):
+        return f'id: {version}\nevent: {name}\ndata: {json.dumps(state)}\n\n'
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenCache:
+    """
+    Bounded, expiring LRU of token key -> (user, token). Entries are evicted on
+    token deletion and user changes by the signals in LittleLemonAPI.signals.
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def evict_user(self, user_id):
+        with self.lock:
+            stale = [key for key, (_, (user, _token)) in self.entries.items() if user.pk == user_id]
+            for key in stale:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(
+    getattr(settings, 'TOKEN_CACHE_MAX_ENTRIES', 10000),
+    getattr(settings, 'TOKEN_CACHE_TTL', 5),
+)
+
+
+def fresh_user(user):
+    # a new instance per request: a shallow copy would share _state and the
+    # caches kept on it with every other request using the cached user
+    names = [field.attname for field in user._meta.concrete_fields]
+    return type(user).from_db(user._state.db, names, [getattr(user, name) for name in names])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication that skips the token/user
+    query for tokens seen within TOKEN_CACHE_TTL seconds.
+    """
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+        user, token = cached
+        # each request gets its own user instance to mutate
+        return fresh_user(user), token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views; header parsing matches TokenAuthentication.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            cached = (token.user, token)
+            token_cache.set(key, cached)
+        user, token = cached
+        return fresh_user(user), token
@@ -0,0 +1,32 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend tuned for serving: WAL so readers never block on the writer,
+    a busy timeout instead of immediate 'database is locked' errors, and a
+    larger page cache and mmap window. OPTIONS['pragmas'] overrides or extends
+    the defaults below; a value of None skips that pragma.
+    """
+    default_pragmas = {
+        'journal_mode': 'WAL',
+        # durable at checkpoints; with WAL this only risks the last commits on power loss
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    }
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**self.default_pragmas, **kwargs.pop('pragmas', {})}
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            if value is None:
+                continue
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
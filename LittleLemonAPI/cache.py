@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from .counters import increment
+from .models import CatalogVersion
+from .renderers import encode_json
+
+CATALOG_VERSION_ID = 1
+
+
+# The version lives in the database, not the Django cache, so every worker,
+# the admin and management commands all see the same one. Reading it is a
+# primary key lookup per catalog request.
+def get_catalog_version():
+    return CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).values_list('version', flat=True).first() or 1
+
+
+async def aget_catalog_version():
+    return await CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).values_list('version', flat=True).afirst() or 1
+
+
+def bump_catalog_version():
+    # a missing row stands for version 1
+    increment(CatalogVersion, {'pk': CATALOG_VERSION_ID}, create={'version': 2}, version=1)
+
+
+class CatalogCache:
+    """
+    Bounded LRU of serialized catalog bodies. Entries are keyed by the catalog
+    version, so a bump makes every older entry unreachable and they age out.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self.entries[key]
+
+    def set(self, key, data):
+        with self.lock:
+            self.entries[key] = data
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+catalog_cache = CatalogCache(getattr(settings, 'CATALOG_CACHE_MAX_ENTRIES', 1024))
+
+
+class CatalogCacheMixin:
+    """
+    Serve GETs for catalog views from catalog_cache, with an ETag derived from
+    the catalog version and the request URL. Bodies are cached with their JSON
+    already encoded.
+    """
+    def catalog_key(self, request, version):
+        url = request.build_absolute_uri()
+        etag = '"%s-%s"' % (version, hashlib.md5(url.encode()).hexdigest()[:16])
+        return (version, url), etag
+
+    def not_modified(self, request, etag):
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return None
+
+    def cached_response(self, body, etag):
+        response = Response(body.data, headers={'ETag': etag})
+        response.encoded_json = body
+        return response
+
+    def catalog_response(self, request, build):
+        key, etag = self.catalog_key(request, get_catalog_version())
+        response = self.not_modified(request, etag)
+        if response:
+            return response
+        body = catalog_cache.get(key)
+        if body is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = encode_json(response.data)
+            catalog_cache.set(key, body)
+        return self.cached_response(body, etag)
+
+    async def acatalog_response(self, request, build):
+        key, etag = self.catalog_key(request, await aget_catalog_version())
+        response = self.not_modified(request, etag)
+        if response:
+            return response
+        body = catalog_cache.get(key)
+        if body is None:
+            response = await build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = encode_json(response.data)
+            catalog_cache.set(key, body)
+        return self.cached_response(body, etag)
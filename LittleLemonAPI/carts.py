@@ -0,0 +1,76 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from django.db.models import F, Sum, ExpressionWrapper, DecimalField
+from .counters import increment
+from .models import Cart, CartTotal
+
+# Incremental maintenance of CartTotal, so the cart badge and the cart summary
+# read one row instead of summing the lines. Lines saved or deleted one by one
+# (the admin, the shell, queryset deletes) are followed by signals; the batch
+# endpoint, checkout and menu item deletes adjust the total themselves. Bulk
+# updates send no signals and should finish with recalculate().
+
+# True while a caller deletes cart lines whose total it settles itself
+settling = ContextVar('littlelemon_cart_settling', default=False)
+
+LINE_TOTAL = ExpressionWrapper(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def adjust(user_id, subtotal, item_count):
+    increment(CartTotal, {'user_id': user_id}, subtotal=subtotal, item_count=item_count)
+
+
+@contextmanager
+def settled():
+    # the cart line post_delete signal skips deletes made in here
+    token = settling.set(True)
+    try:
+        yield
+    finally:
+        settling.reset(token)
+
+
+def add_line(user_id, quantity, unit_price, sign=1):
+    adjust(user_id, sign * quantity * unit_price, sign * quantity)
+
+
+def remove_lines(lines):
+    """
+    Subtract cart lines about to be deleted; lines are (user_id, quantity,
+    unit_price). One UPDATE per user, however many lines each has.
+    """
+    per_user = defaultdict(lambda: [Decimal(0), 0])
+    for user_id, quantity, unit_price in lines:
+        per_user[user_id][0] += quantity * unit_price
+        per_user[user_id][1] += quantity
+    for user_id, (subtotal, item_count) in per_user.items():
+        adjust(user_id, -subtotal, -item_count)
+
+
+def claim(user_id):
+    """
+    Write to the user's total before reading their lines, so a concurrent
+    change to the same cart waits for this transaction (the write lock on
+    SQLite, a row lock elsewhere).
+    """
+    adjust(user_id, 0, 0)
+
+
+def clear(user_id):
+    CartTotal.objects.filter(user_id=user_id).update(subtotal=0, item_count=0)
+
+
+def summary(user_id):
+    # (subtotal, item_count); a user who never had a cart has no row yet
+    row = CartTotal.objects.filter(user_id=user_id).values_list('subtotal', 'item_count').first()
+    return row or (Decimal('0.00'), 0)
+
+
+def recalculate(user_id):
+    totals = Cart.objects.filter(user_id=user_id).aggregate(subtotal=Sum(LINE_TOTAL), item_count=Sum('quantity'))
+    CartTotal.objects.update_or_create(
+        user_id=user_id,
+        defaults={'subtotal': totals['subtotal'] or 0, 'item_count': totals['item_count'] or 0},
+    )
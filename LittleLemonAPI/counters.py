@@ -0,0 +1,22 @@
+from django.db import transaction, IntegrityError
+from django.db.models import F
+
+# Counter rows kept up to date with F() updates: the sales rollups, the cart
+# totals and the catalog version.
+
+
+def increment(model, lookup, using='default', create=None, **deltas):
+    """
+    Add deltas to the fields of the row matching lookup. A missing row is
+    created with the field values in `create`, or else the deltas themselves.
+    """
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    queryset = model.objects.using(using).filter(**lookup)
+    if queryset.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=using):
+            model.objects.using(using).create(**lookup, **(deltas if create is None else create))
+    except IntegrityError:
+        # created concurrently: the row exists now
+        queryset.update(**changes)
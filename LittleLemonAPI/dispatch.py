@@ -0,0 +1,65 @@
+import heapq
+from django.db import transaction
+from django.db.models import Count
+from .models import Order
+from .notifier import order_notifier
+
+
+def dispatch_queue():
+    # unassigned, undelivered orders, oldest first (order_crew_date_idx)
+    return Order.objects.filter(delivery_crew__isnull=True, status=False).order_by('date', 'id')
+
+
+def open_order_counts(crew_ids):
+    counts = dict.fromkeys(crew_ids, 0)
+    counts.update(
+        Order.objects.filter(delivery_crew__in=crew_ids, status=False)
+        .values_list('delivery_crew').annotate(open=Count('id')).order_by()
+    )
+    return counts
+
+
+def plan_assignments(order_ids, counts):
+    """
+    Hand each order, oldest first, to the crew member with the fewest open
+    orders so far. Returns {crew id: [order ids]}.
+    """
+    heap = [(count, crew_id) for crew_id, count in counts.items()]
+    heapq.heapify(heap)
+    plan = {crew_id: [] for crew_id in counts}
+    for order_id in order_ids:
+        count, crew_id = heapq.heappop(heap)
+        plan[crew_id].append(order_id)
+        heapq.heappush(heap, (count + 1, crew_id))
+    return plan
+
+
+def assign_orders(crew_ids, limit):
+    """
+    Assign up to `limit` queued orders across crew_ids, one UPDATE per crew
+    member whatever the number of orders. Returns {crew id: [order ids]}.
+    """
+    if not crew_ids:
+        return {}
+    with transaction.atomic():
+        # row locks where the database has them, so concurrent dispatches take different orders
+        order_ids = list(dispatch_queue().select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+        plan = plan_assignments(order_ids, open_order_counts(crew_ids))
+        assigned = {}
+        for crew_id, ids in plan.items():
+            if not ids:
+                continue
+            # the queue filter again, so an order assigned meanwhile is left alone
+            updated = Order.objects.filter(id__in=ids, delivery_crew__isnull=True, status=False).update(delivery_crew_id=crew_id)
+            if updated != len(ids):
+                ids = list(Order.objects.filter(id__in=ids, delivery_crew_id=crew_id).values_list('id', flat=True))
+            if ids:
+                assigned[crew_id] = ids
+
+        # update() sends no post_save, so tell the order watchers here
+        def publish():
+            for crew_id, ids in assigned.items():
+                for order_id in ids:
+                    order_notifier.publish(order_id, {'id': order_id, 'status': False, 'delivery_crew': crew_id})
+        transaction.on_commit(publish)
+    return assigned
@@ -0,0 +1,65 @@
+import csv
+from itertools import groupby, islice
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Streaming order exports: one query walked with a server-side chunked
+# iterator, written out a row at a time so memory does not grow with history.
+
+CHUNK_SIZE = 2000
+
+ORDER_FIELDS = ['id', 'date', 'user__username', 'delivery_crew__username', 'status', 'total']
+ITEM_FIELDS = ['orderitem__menuitem_id', 'orderitem__menuitem__title', 'orderitem__quantity', 'orderitem__unit_price', 'orderitem__total']
+CSV_HEADER = ['order_id', 'date', 'user', 'delivery_crew', 'status', 'order_total', 'menuitem_id', 'menuitem', 'quantity', 'unit_price', 'total']
+
+
+def export_rows(orders):
+    """
+    Yield one tuple per order line (orders without lines yield one row with
+    empty item columns), in order id order.
+    """
+    rows = orders.values_list(*ORDER_FIELDS, *ITEM_FIELDS).order_by('id', 'orderitem__id')
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    # csv.writer target that hands each formatted line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def stream_csv(orders):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in export_rows(orders):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(orders):
+    # one JSON object per order with its lines nested; rows arrive grouped by order
+    encoder = DjangoJSONEncoder()
+    for order, lines in groupby(export_rows(orders), key=lambda row: row[:len(ORDER_FIELDS)]):
+        order_id, date, user, delivery_crew, status, total = order
+        items = [
+            {'menuitem_id': line[6], 'menuitem': line[7], 'quantity': line[8], 'unit_price': line[9], 'total': line[10]}
+            for line in lines if line[6] is not None
+        ]
+        yield encoder.encode({
+            'id': order_id, 'date': date, 'user': user, 'delivery_crew': delivery_crew,
+            'status': status, 'total': total, 'order_items': items,
+        }) + '\n'
+
+
+async def astream(lines):
+    """
+    An async iterator over a stream_csv()/stream_ndjson() generator, for ASGI.
+    Django would otherwise collect a sync iterator into one list before
+    sending it. The generator, and the cursor it holds, advance in the
+    request's sync thread a CHUNK_SIZE batch of lines at a time.
+    """
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, CHUNK_SIZE)))
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        yield batch
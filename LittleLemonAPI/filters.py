@@ -0,0 +1,47 @@
+from django.db import connections
+from rest_framework.filters import SearchFilter
+
+MENU_FTS_TABLE = 'LittleLemonAPI_menuitem_fts'
+
+_fts_tables = {}
+
+
+def has_menu_fts(alias):
+    """
+    Whether the database behind alias has the FTS5 menu index (see migration
+    0005). Checked once per alias.
+    """
+    if alias not in _fts_tables:
+        connection = connections[alias]
+        _fts_tables[alias] = (
+            connection.vendor == 'sqlite'
+            and MENU_FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[alias]
+
+
+def fts_query(terms):
+    # every term is a quoted prefix query; FTS5 ANDs them together
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+class MenuItemSearchFilter(SearchFilter):
+    """
+    ?search= over menu item titles and category names through the FTS5 index,
+    ranked by bm25 unless the request asked for an ordering. Falls back to
+    SearchFilter's LIKE lookups where the index does not exist.
+    """
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not has_menu_fts(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+        table = queryset.model._meta.db_table
+        queryset = queryset.extra(
+            tables=[MENU_FTS_TABLE],
+            where=[f'"{MENU_FTS_TABLE}".rowid = "{table}".id', f'"{MENU_FTS_TABLE}" MATCH %s'],
+            params=[fts_query(terms)],
+            select={'search_rank': f'bm25("{MENU_FTS_TABLE}")'},
+        )
+        if not queryset.query.order_by:
+            queryset = queryset.extra(order_by=['search_rank'])
+        return queryset
@@ -0,0 +1,91 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+from .renderers import EncodedJSON, encode_json
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# stored keys are pruned on every PRUNE_EVERY-th insert
+PRUNE_EVERY = 100
+
+
+def fingerprint(request):
+    # QueryDicts serialize with their value lists, so form and JSON bodies both work
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def replay(record):
+    body = EncodedJSON(record.body.encode())
+    body.data = json.loads(record.body) if record.body else None
+    response = Response(body.data, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+    response.encoded_json = body
+    return response
+
+
+def prune(record, now):
+    max_keys = getattr(settings, 'IDEMPOTENCY_MAX_KEYS', 100000)
+    expired = now - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+    # ids only grow, so everything max_keys inserts back is the oldest
+    IdempotencyKey.objects.filter(Q(created_at__lt=expired) | Q(id__lte=record.id - max_keys)).delete()
+
+
+def idempotent(handler):
+    """
+    Make a view's POST handler safe to retry. The first successful response to
+    a request with an Idempotency-Key header is stored, in the same
+    transaction as the handler's writes, and returned again to any retry with
+    the same key without running the handler. A key reused for a different
+    request gets a 422. Requests without the header run as before.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}, status=status.HTTP_400_BAD_REQUEST)
+
+        digest = fingerprint(request)
+        now = timezone.now()
+        ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+        with transaction.atomic():
+            # claim the key first: a concurrent retry blocks on it until this commits, so
+            # no one ever sees the placeholder status_code
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=digest, status_code=0)
+            except IntegrityError:
+                record = IdempotencyKey.objects.get(user=request.user, key=key)
+                if record.created_at < now - ttl:
+                    record.delete()
+                    record = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=digest, status_code=0)
+                elif record.fingerprint != digest:
+                    return Response({'error': f'This {HEADER} was used for a different request'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                else:
+                    return replay(record)
+
+            # a savepoint, so a handler that catches a database error can still answer
+            with transaction.atomic():
+                response = handler(self, request, *args, **kwargs)
+            if not status.is_success(response.status_code):
+                # nothing was written; let the client fix the request and retry with the key
+                record.delete()
+                return response
+            body = encode_json(response.data) if response.data is not None else EncodedJSON()
+            record.status_code = response.status_code
+            record.body = body.decode()
+            record.save(update_fields=['status_code', 'body'])
+            response.encoded_json = body
+            if record.id % PRUNE_EVERY == 0:
+                prune(record, now)
+        return response
+    return wrapper
@@ -0,0 +1,109 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# The RequestMetrics being recorded for the current request, if any
+current_metrics = ContextVar('littlelemon_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Query count and SQL time, statements seen more than once (usually an N+1)
+    and named timings such as 'serialize' and 'render', for one request.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.timings = Counter()
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self):
+        if not self.duplicates:
+            return None
+        sql, count = self.statements.most_common(1)[0]
+        return {'sql': sql, 'count': count}
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        entries = [f'sql;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries, {self.duplicates} duplicates"']
+        entries += [f'{name};dur={duration * 1000:.2f}' for name, duration in self.timings.items()]
+        entries.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(entries)
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'duplicates': self.duplicates,
+            'most_repeated': self.most_repeated(),
+            **{f'{name}_ms': round(duration * 1000, 2) for name, duration in self.timings.items()},
+            'total_ms': round(self.elapsed() * 1000, 2),
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    # execute wrapper on every connection once install() ran; a no-op outside recording()
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_time += time.perf_counter() - start
+        metrics.queries += 1
+        metrics.statements[sql] += 1
+
+
+def add_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """
+    Put record_query on this thread's connections and on every connection
+    opened from now on. Nothing is installed while metrics are off.
+    """
+    for connection in connections.all():
+        add_wrapper(connection)
+    connection_created.connect(add_wrapper, dispatch_uid='littlelemon_record_query')
+
+
+@contextmanager
+def recording():
+    install()
+    metrics = RequestMetrics()
+    token = current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current_metrics.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the current request's timing `name`,
+    less any SQL run inside it, which is already counted as sql.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    sql_time = metrics.sql_time
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start - (metrics.sql_time - sql_time)
@@ -0,0 +1,31 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from LittleLemonAPI import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move delivered orders older than --days into the order archive, one short '
+        'transaction per batch. Safe to interrupt and run again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ORDER_ARCHIVE_DAYS', 90))
+        parser.add_argument('--batch-size', type=int, default=500)
+        # seconds between batches, to give request writes the database
+        parser.add_argument('--pause', type=float, default=0)
+
+    def handle(self, *args, **options):
+        moved = batches = 0
+        while True:
+            count = archive.archive_batch(options['days'], options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Batch {batches}: {count} order(s)')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} order(s) in {batches} batch(es)'))
@@ -0,0 +1,281 @@
+import json
+import math
+import random
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from LittleLemonAPI import carts, rollups
+from LittleLemonAPI.authentication import token_cache
+from LittleLemonAPI.cache import catalog_cache
+from LittleLemonAPI.models import Category, MenuItem, Cart, Order, OrderItem
+from LittleLemonAPI.roles import MANAGER, CUSTOMER, DELIVERY_CREW, invalidate_roles
+
+
+def percentile(values, pct):
+    # nearest rank on an already sorted list
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a dataset and drive every API route in-process, reporting latency '
+        'percentiles, throughput and SQL queries per endpoint. Everything runs in '
+        'one transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--menu-items', type=int, default=200)
+        parser.add_argument('--customers', type=int, default=50)
+        parser.add_argument('--delivery-crew', type=int, default=5)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=50, help='timed requests per endpoint')
+        parser.add_argument('--mix', type=int, default=500, help='requests in the weighted mixed run')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        no_throttle = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={'anon': None, 'user': None})
+        # no replica routing: its connection could not see the uncommitted seed data
+        overrides = override_settings(
+            REST_FRAMEWORK=no_throttle, DEBUG=False, ALLOWED_HOSTS=['testserver'], DATABASE_ROUTERS=[],
+        )
+        self.client = Client()
+        self.user_ids = []
+        try:
+            with overrides, transaction.atomic():
+                self.seed(options)
+                scenarios = self.scenarios()
+                endpoints = {}
+                for name, weight, role, build in scenarios:
+                    self.call(self.user_for(role, 0), *build(0))
+                    endpoints[name] = self.measure(role, build, options['requests'])
+                    self.report(name, endpoints[name])
+                mix = self.run_mix(scenarios, options['mix'])
+                transaction.set_rollback(True)
+        finally:
+            catalog_cache.clear()
+            token_cache.clear()
+            invalidate_roles(*self.user_ids)
+
+        self.stdout.write(f"mixed traffic: {mix['requests']} requests, {mix['throughput_rps']:.1f} req/s, errors {mix['errors']}")
+        results = {
+            'options': {key: options[key] for key in ('categories', 'menu_items', 'customers', 'delivery_crew', 'orders', 'requests', 'mix', 'seed')},
+            'endpoints': endpoints,
+            'mix': mix,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def seed(self, options):
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in (MANAGER, CUSTOMER, DELIVERY_CREW)}
+
+        def users(role, count):
+            created = []
+            for i in range(count):
+                user = User.objects.create(username=f'bench-{role}-{i}')
+                user.groups.add(groups[role])
+                created.append(user)
+            return created
+
+        self.managers = users(MANAGER, 2)
+        self.customers = users(CUSTOMER, options['customers'])
+        self.crew = users(DELIVERY_CREW, options['delivery_crew'])
+        self.groups = groups
+        everyone = self.managers + self.customers + self.crew
+        self.user_ids = [user.id for user in everyone]
+        self.tokens = {user.id: Token.objects.create(user=user).key for user in everyone}
+
+        self.categories = Category.objects.bulk_create(
+            Category(slug=f'bench-{i}', name=f'Bench category {i}') for i in range(options['categories'])
+        )
+        self.menu_items = MenuItem.objects.bulk_create(
+            MenuItem(
+                title=f'Bench dish {i}',
+                price=random.randint(200, 3000) / 100,
+                featured=random.random() < 0.1,
+                category=random.choice(self.categories),
+            )
+            for i in range(options['menu_items'])
+        )
+        for customer in self.customers:
+            Cart.objects.bulk_create(
+                Cart(user=customer, menuitem=item, quantity=random.randint(1, 3), unit_price=item.price)
+                for item in random.sample(self.menu_items, 3)
+            )
+            carts.recalculate(customer.pk)
+
+        # historical orders spread over the last 90 days
+        orders = Order.objects.bulk_create(
+            Order(
+                user=random.choice(self.customers),
+                delivery_crew=random.choice(self.crew) if random.random() < 0.7 else None,
+                status=random.random() < 0.5,
+                total=0,
+            )
+            for _ in range(options['orders'])
+        )
+        lines = []
+        totals = {}
+        for order in orders:
+            for item in random.sample(self.menu_items, random.randint(1, 4)):
+                quantity = random.randint(1, 3)
+                lines.append(OrderItem(order=order, menuitem=item, quantity=quantity, unit_price=item.price, total=item.price * quantity))
+                totals[order.id] = totals.get(order.id, 0) + item.price * quantity
+        OrderItem.objects.bulk_create(lines, batch_size=500)
+        for order in orders:
+            order.total = totals[order.id]
+        Order.objects.bulk_update(orders, ['total'], batch_size=500)
+        days = {}
+        for order in orders:
+            days.setdefault(random.randint(0, 89), []).append(order.id)
+        today = timezone.now().date()
+        for offset, ids in days.items():
+            Order.objects.filter(id__in=ids).update(date=today - timedelta(days=offset))
+        rollups.rebuild()
+        self.orders = {customer.id: [] for customer in self.customers}
+        for order in orders:
+            self.orders[order.user_id].append(order.id)
+
+    def scenarios(self):
+        """
+        (name, mix weight, role, build) for every route; build(i) does any
+        untimed setup and returns (method, path, data) for the i-th request.
+        """
+        today = timezone.now().date()
+
+        def customer(i):
+            return self.customers[i % len(self.customers)]
+
+        def item(i):
+            return self.menu_items[i % len(self.menu_items)]
+
+        def spare_crew_member(i):
+            user = User.objects.create(username=f'bench-spare-{i}-{random.random()}')
+            user.groups.add(self.groups[DELIVERY_CREW])
+            return ('DELETE', f'/api/groups/{DELIVERY_CREW}/users/{user.id}', None)
+
+        def add_to_cart(i):
+            Cart.objects.filter(user=customer(i), menuitem=item(i)).delete()
+            return ('POST', '/api/cart/menu-items', {'menuitem_id': item(i).id, 'quantity': 2})
+
+        def checkout(i):
+            Cart.objects.bulk_create(
+                [Cart(user=customer(i), menuitem=menuitem, quantity=1, unit_price=menuitem.price) for menuitem in random.sample(self.menu_items, 3)],
+                ignore_conflicts=True,
+            )
+            return ('POST', '/api/orders', None)
+
+        def own_order(i):
+            orders = self.orders[customer(i).id] or [Order.objects.create(user=customer(i), total=0).id]
+            return orders[i % len(orders)]
+
+        def new_order(i):
+            return Order.objects.create(user=customer(i), total=0).id
+
+        def queue_and_dispatch(i):
+            Order.objects.bulk_create(Order(user=customer(i + n), total=0) for n in range(20))
+            return ('POST', '/api/orders/dispatch', {'limit': 20})
+
+        def new_menu_item(i):
+            return MenuItem.objects.create(title=f'Bench doomed {i}-{random.random()}', price=1, category=self.categories[0]).id
+
+        return [
+            ('GET groups/users', 1, 'manager', lambda i: ('GET', f'/api/groups/{DELIVERY_CREW}/users', None)),
+            ('POST groups/users', 1, 'manager', lambda i: ('POST', f'/api/groups/{DELIVERY_CREW}/users', {'username': self.crew[i % len(self.crew)].username})),
+            ('DELETE groups/users/<pk>', 1, 'manager', spare_crew_member),
+            ('GET categories', 2, 'manager', lambda i: ('GET', '/api/categories', None)),
+            ('POST categories', 1, 'manager', lambda i: ('POST', '/api/categories', {'slug': f'bench-new-{i}-{random.randint(0, 10**9)}', 'name': 'New'})),
+            ('GET menu-items', 30, 'customer', lambda i: ('GET', f'/api/menu-items?page={i % 5 + 1}&perpage=20&ordering=price', None)),
+            ('GET menu-items search', 10, 'customer', lambda i: ('GET', f'/api/menu-items?search=dish {i % 50}&page=1&perpage=20', None)),
+            ('GET menu-items cursor', 5, 'customer', lambda i: ('GET', '/api/menu-items?pagination=cursor', None)),
+            ('POST menu-items', 1, 'manager', lambda i: ('POST', '/api/menu-items', {'title': f'Bench new dish {i}-{random.random()}', 'price': '9.99', 'category_id': self.categories[0].id})),
+            ('GET menu-items/<pk>', 15, 'customer', lambda i: ('GET', f'/api/menu-items/{item(i).id}', None)),
+            ('PATCH menu-items/<pk>', 1, 'manager', lambda i: ('PATCH', f'/api/menu-items/{item(i).id}', {'featured': i % 2 == 0})),
+            ('DELETE menu-items/<pk>', 1, 'manager', lambda i: ('DELETE', f'/api/menu-items/{new_menu_item(i)}', None)),
+            ('POST menu-items/bulk', 1, 'manager', lambda i: ('POST', '/api/menu-items/bulk', {'items': [{'id': item(i + n).id, 'featured': n % 2 == 0} for n in range(20)], 'categories': [{'category_id': self.categories[i % len(self.categories)].id, 'percent': '1'}]})),
+            ('GET cart/menu-items', 10, 'customer', lambda i: ('GET', '/api/cart/menu-items', None)),
+            ('POST cart/menu-items', 5, 'customer', add_to_cart),
+            ('POST cart/menu-items/batch', 3, 'customer', lambda i: ('POST', '/api/cart/menu-items/batch', {'items': [{'menuitem_id': item(i + n).id, 'quantity': 1} for n in range(3)]})),
+            ('GET cart/summary', 10, 'customer', lambda i: ('GET', '/api/cart/summary', None)),
+            ('GET orders (customer)', 8, 'customer', lambda i: ('GET', '/api/orders', None)),
+            ('GET orders (manager)', 2, 'manager', lambda i: ('GET', '/api/orders', None)),
+            ('GET orders (delivery crew)', 2, 'crew', lambda i: ('GET', '/api/orders', None)),
+            ('POST orders', 3, 'customer', checkout),
+            ('GET orders/<pk>', 5, 'customer', lambda i: ('GET', f'/api/orders/{own_order(i)}', None)),
+            ('PUT orders/<pk>', 1, 'manager', lambda i: ('PUT', f'/api/orders/{new_order(i)}', {'delivery_crew': self.crew[i % len(self.crew)].username, 'status': 0})),
+            ('PATCH orders/<pk>', 1, 'crew', lambda i: ('PATCH', f'/api/orders/{new_order(i)}', {'status': 1})),
+            ('DELETE orders/<pk>', 1, 'manager', lambda i: ('DELETE', f'/api/orders/{new_order(i)}', None)),
+            ('GET orders/dispatch', 1, 'manager', lambda i: ('GET', '/api/orders/dispatch', None)),
+            ('POST orders/dispatch', 1, 'manager', queue_and_dispatch),
+            ('GET orders/export', 1, 'manager', lambda i: ('GET', f'/api/orders/export?type=csv&from={today - timedelta(days=7)}', None)),
+            ('GET reports/sales', 1, 'manager', lambda i: ('GET', f'/api/reports/sales?from={today - timedelta(days=30)}&to={today}', None)),
+        ]
+
+    def user_for(self, role, i):
+        users = {'manager': self.managers, 'customer': self.customers, 'crew': self.crew}[role]
+        return users[i % len(users)]
+
+    def call(self, user, method, path, data):
+        headers = {'Authorization': f'Token {self.tokens[user.id]}'}
+        body = json.dumps(data) if data is not None else ''
+        response = self.client.generic(method, path, body, content_type='application/json', headers=headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    def measure(self, role, build, count):
+        timings = []
+        queries = []
+        statuses = {}
+        for i in range(count):
+            # the i-th customer is the one build(i) set up
+            user = self.user_for(role, i)
+            request = build(i)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                code = self.call(user, *request)
+                timings.append(time.perf_counter() - start)
+            queries.append(len(ctx.captured_queries))
+            statuses[code] = statuses.get(code, 0) + 1
+        total = sum(timings)
+        timings.sort()
+        return {
+            'requests': count,
+            'errors': sum(n for code, n in statuses.items() if code >= 400),
+            'statuses': {str(code): n for code, n in sorted(statuses.items())},
+            'p50_ms': percentile(timings, 50) * 1000,
+            'p95_ms': percentile(timings, 95) * 1000,
+            'p99_ms': percentile(timings, 99) * 1000,
+            'throughput_rps': count / total,
+            'queries_mean': sum(queries) / count,
+            'queries_max': max(queries),
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:28} p50 {result['p50_ms']:7.2f}ms  p95 {result['p95_ms']:7.2f}ms  p99 {result['p99_ms']:7.2f}ms  "
+            f"{result['throughput_rps']:8.1f} req/s  queries {result['queries_mean']:5.1f} (max {result['queries_max']})  "
+            f"errors {result['errors']}"
+        )
+
+    def run_mix(self, scenarios, count):
+        picks = random.choices(scenarios, weights=[weight for _, weight, _, _ in scenarios], k=count)
+        errors = 0
+        elapsed = 0
+        for i, (name, weight, role, build) in enumerate(picks):
+            user = self.user_for(role, i)
+            request = build(i)
+            start = time.perf_counter()
+            errors += self.call(user, *request) >= 400
+            elapsed += time.perf_counter() - start
+        return {'requests': count, 'errors': errors, 'throughput_rps': count / elapsed if elapsed else 0}
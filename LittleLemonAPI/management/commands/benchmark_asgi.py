@@ -0,0 +1,82 @@
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.test import Client, AsyncClient, override_settings
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+
+PATHS = ['/api/menu-items?perpage=20&page=1&ordering=price', '/api/categories', '/api/orders']
+
+
+def reload_urls():
+    # the root URLconf picks the API routes from ASYNC_READ_VIEWS at import
+    import LittleLemon.urls
+    importlib.reload(LittleLemon.urls)
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec on the read endpoints: WSGI, ASGI with sync views and ASGI with async views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=3000)
+
+    def handle(self, *args, **options):
+        # committed, since the WSGI run reads from other threads' connections;
+        # removed again in the finally below
+        user, created_user = User.objects.get_or_create(username='benchmark-manager')
+        group, created_group = Group.objects.get_or_create(name='manager')
+        try:
+            user.groups.add(group)
+            token, _ = Token.objects.get_or_create(user=user)
+            self.auth = {'Authorization': f'Token {token.key}'}
+            self.run_all(options)
+        finally:
+            if created_user:
+                # takes the token and the group membership along
+                user.delete()
+            else:
+                Token.objects.filter(user=user).delete()
+                user.groups.remove(group)
+            if created_group:
+                group.delete()
+            reload_urls()
+
+    def run_all(self, options):
+        no_throttle = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={'anon': None, 'user': None})
+        with override_settings(REST_FRAMEWORK=no_throttle, DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            for name, async_views, run in [
+                ('wsgi (sync views)', False, self.run_wsgi),
+                ('asgi (sync views)', False, self.run_asgi),
+                ('asgi (async views)', True, self.run_asgi),
+            ]:
+                with override_settings(ASYNC_READ_VIEWS=async_views):
+                    reload_urls()
+                    start = time.perf_counter()
+                    codes = run(options['concurrency'], options['requests'])
+                    elapsed = time.perf_counter() - start
+                errors = sum(1 for code in codes if code != 200)
+                self.stdout.write(f'{name:20} {len(codes) / elapsed:9.1f} req/s  errors {errors}')
+
+    def run_wsgi(self, concurrency, total):
+        def request(i):
+            return Client().get(PATHS[i % len(PATHS)], headers=self.auth).status_code
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(request, range(total)))
+
+    def run_asgi(self, concurrency, total):
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            client = AsyncClient()
+
+            async def request(i):
+                async with semaphore:
+                    response = await client.get(PATHS[i % len(PATHS)], headers=self.auth)
+                    return response.status_code
+            return await asyncio.gather(*(request(i) for i in range(total)))
+        return asyncio.run(main())
@@ -0,0 +1,84 @@
+import random
+import time
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from LittleLemonAPI import rows
+from LittleLemonAPI.models import Category, MenuItem, Cart, Order, OrderItem
+from LittleLemonAPI.renderers import JSONRenderer
+from LittleLemonAPI.serializers import CategorySerializer, MenuItemSerializer, CartSerializer, OrderListSerializer
+from LittleLemonAPI.views import order_list_queryset
+from LittleLemonAPI.roles import MANAGER
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/sec of the list serializers and the values() rows in LittleLemonAPI.rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=100)
+        parser.add_argument('--seconds', type=float, default=2)
+
+    def handle(self, *args, **options):
+        # seeded and measured inside one transaction that is rolled back
+        with transaction.atomic():
+            customer, manager = self.seed(options['menu_items'], options['orders'])
+            categories = Category.objects.all()
+            menu_items = MenuItem.objects.select_related('category')
+            cart = Cart.objects.filter(user=customer)
+            orders = order_list_queryset(manager, {MANAGER})
+            cases = [
+                ('categories', len(categories),
+                 lambda: CategorySerializer(categories.all(), many=True).data,
+                 lambda: rows.category_rows(categories)),
+                ('menu-items', len(menu_items),
+                 lambda: MenuItemSerializer(menu_items.all(), many=True).data,
+                 lambda: rows.menu_item_rows(menu_items)),
+                ('cart', len(cart),
+                 lambda: CartSerializer(cart.all(), many=True).data,
+                 lambda: rows.cart_rows(customer)),
+                ('orders', len(orders),
+                 lambda: OrderListSerializer(orders.all(), many=True).data,
+                 lambda: rows.order_rows(list(Order.objects.order_by('-date', '-id').values_list(*rows.ORDER_FIELDS)))),
+            ]
+            renderer = JSONRenderer()
+            for name, count, serialized, fast in cases:
+                if renderer.render(serialized()) != renderer.render(fast()):
+                    self.stderr.write(f'{name}: rows differ from the serializer output')
+                before = self.rate(lambda: renderer.render(serialized()), count, options['seconds'])
+                after = self.rate(lambda: renderer.render(fast()), count, options['seconds'])
+                self.stdout.write(
+                    f'{name:10} rows {count:6}  serializer rows/s {before:10.0f}  '
+                    f'values rows/s {after:10.0f}  x{after / before:.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def rate(self, render, count, seconds):
+        runs = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            render()
+            runs += 1
+        return runs * count / (time.perf_counter() - start)
+
+    def seed(self, menu_item_count, order_count):
+        customer = User.objects.create(username='bench-serialization-customer')
+        customer.groups.add(Group.objects.get_or_create(name='customer')[0])
+        manager = User.objects.create(username='bench-serialization-manager')
+        manager.groups.add(Group.objects.get_or_create(name='manager')[0])
+        category = Category.objects.create(slug='bench-serialization', name='Bench')
+        menu_items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Bench serialization {i}', price=random.randint(100, 2000) / 100, category=category)
+            for i in range(menu_item_count)
+        )
+        Cart.objects.bulk_create(
+            Cart(user=customer, menuitem=item, quantity=2, unit_price=item.price) for item in menu_items[:20]
+        )
+        for _ in range(order_count):
+            order = Order.objects.create(user=customer, delivery_crew=manager, total=0)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price, total=item.price)
+                for item in random.sample(menu_items, 3)
+            )
+        return customer, manager
@@ -0,0 +1,96 @@
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction, OperationalError
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+
+# today's configuration versus the tuned backend in LittleLemonAPI/backends
+PROFILES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {'ENGINE': 'LittleLemonAPI.backends.sqlite3', 'CONN_MAX_AGE': 600, 'OPTIONS': {}},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent order writes and menu reads on the default and tuned SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--menu-items', type=int, default=200)
+
+    def handle(self, *args, **options):
+        workdir = Path(tempfile.mkdtemp(prefix='littlelemon-bench-'))
+        try:
+            for name, profile in PROFILES.items():
+                alias = f'bench_{name}'
+                connections.settings[alias] = dict(
+                    connections.settings['default'], **profile, NAME=str(workdir / f'{name}.sqlite3'),
+                )
+                call_command('migrate', database=alias, verbosity=0)
+                self.seed(alias, options['menu_items'])
+                results = self.run(alias, options)
+                self.stdout.write(
+                    f"{name:8} writes/s {results['writes'] / options['seconds']:9.1f}  "
+                    f"reads/s {results['reads'] / options['seconds']:9.1f}  "
+                    f"locked errors {results['errors']}"
+                )
+                connections[alias].close()
+        finally:
+            shutil.rmtree(workdir)
+
+    def seed(self, alias, count):
+        category = Category.objects.using(alias).create(slug='bench', name='Bench')
+        MenuItem.objects.using(alias).bulk_create(
+            MenuItem(title=f'Item {i}', price=random.randint(100, 2000) / 100, category=category)
+            for i in range(count)
+        )
+        User.objects.using(alias).create(username='bench')
+
+    def run(self, alias, options):
+        results = {'writes': 0, 'reads': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        menu_ids = list(MenuItem.objects.using(alias).values_list('id', 'price'))
+        user = User.objects.using(alias).get(username='bench')
+
+        def write():
+            items = random.sample(menu_ids, 3)
+            with transaction.atomic(using=alias):
+                order = Order.objects.using(alias).create(user=user, total=sum(price for _, price in items))
+                OrderItem.objects.using(alias).bulk_create(
+                    OrderItem(order=order, menuitem_id=pk, quantity=1, unit_price=price, total=price)
+                    for pk, price in items
+                )
+
+        def read():
+            list(MenuItem.objects.using(alias).select_related('category').order_by('price')[:50])
+
+        def worker(op, counter):
+            db = connections[alias]
+            while time.monotonic() < deadline:
+                try:
+                    op()
+                    outcome = counter
+                except OperationalError:
+                    outcome = 'errors'
+                with lock:
+                    results[outcome] += 1
+                # what request_finished does at the end of every request
+                db.close_if_unusable_or_obsolete()
+            db.close()
+
+        threads = [threading.Thread(target=worker, args=(write, 'writes')) for _ in range(options['writers'])]
+        threads += [threading.Thread(target=worker, args=(read, 'reads')) for _ in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
@@ -0,0 +1,171 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from LittleLemonAPI.cache import bump_catalog_version
+from LittleLemonAPI.models import Category, MenuItem
+
+CENT = Decimal('0.01')
+MAX_PRICE = Decimal('10000')
+TRUE = {'1', 'true', 'yes', 'y', 't'}
+
+
+def iter_json_array(f, chunk_size=65536):
+    """
+    Yield the objects of a top-level JSON array one at a time, reading the
+    file in chunks instead of loading it whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = f.read(chunk_size)
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise CommandError('JSON input must be an array of menu items')
+                buffer = buffer[1:]
+                started = True
+                continue
+            buffer = buffer.lstrip(', \t\r\n')
+            if buffer.startswith(']'):
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # the object runs past this chunk
+                break
+            buffer = buffer[end:]
+            yield obj
+        if not chunk:
+            if buffer.strip():
+                raise CommandError('Truncated JSON input')
+            return
+
+
+def iter_json_lines(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert or update menu items and their categories from a CSV, JSON array or '
+        'JSON lines file with title, price, featured, category and optional '
+        'category_name fields, matching items on title and categories on slug.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower().replace('ndjson', 'jsonl')
+        if file_format not in ('csv', 'json', 'jsonl'):
+            raise CommandError('Pass --format csv, json or jsonl')
+
+        self.counts = dict.fromkeys(['inserted', 'updated', 'unchanged', 'skipped', 'categories_inserted', 'categories_updated'], 0)
+        self.categories = {}
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = {'csv': csv.DictReader, 'json': iter_json_array, 'jsonl': iter_json_lines}[file_format](f)
+                rows = enumerate(rows, start=1)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    with transaction.atomic():
+                        self.import_batch(batch)
+        finally:
+            # bulk writes send no signals, so cached catalog responses are dropped here
+            if self.counts['inserted'] or self.counts['updated'] or self.counts['categories_inserted'] or self.counts['categories_updated']:
+                bump_catalog_version()
+
+        counts = self.counts
+        self.stdout.write(self.style.SUCCESS(
+            f"Menu items: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged, "
+            f"{counts['skipped']} skipped. Categories: {counts['categories_inserted']} inserted, "
+            f"{counts['categories_updated']} updated."
+        ))
+
+    def parse(self, number, row):
+        try:
+            title = str(row['title']).strip()
+            price = Decimal(str(row['price'])).quantize(CENT)
+            slug = str(row['category']).strip()
+            category_name = (row.get('category_name') or '').strip()
+            featured = row.get('featured') or False
+            valid = title and len(title) <= 255 and slug and len(slug) <= 50 and price.is_finite() and Decimal(0) <= price < MAX_PRICE
+        except (KeyError, TypeError, AttributeError, InvalidOperation):
+            # a missing field, a row that is not an object, a non-string name or a price like 'NaN'
+            valid = False
+        if not valid:
+            self.counts['skipped'] += 1
+            self.stderr.write(f'Row {number}: needs a title, a price from 0 to 9999.99 and a category')
+            return None
+        if isinstance(featured, str):
+            featured = featured.strip().lower() in TRUE
+        return title, price, bool(featured), slug, category_name
+
+    def import_batch(self, batch):
+        # the last row wins when a title repeats
+        items = {}
+        for number, row in batch:
+            parsed = self.parse(number, row)
+            if parsed:
+                items[parsed[0]] = parsed
+        if not items:
+            return
+        category_ids = self.sync_categories({slug: name for _, _, _, slug, name in items.values()})
+
+        existing = {
+            title: (price, featured, category_id)
+            for title, price, featured, category_id in MenuItem.objects.filter(title__in=items).values_list('title', 'price', 'featured', 'category_id')
+        }
+        changed = []
+        for title, price, featured, slug, _ in items.values():
+            values = (price, featured, category_ids[slug])
+            if title not in existing:
+                self.counts['inserted'] += 1
+            elif existing[title] == values:
+                self.counts['unchanged'] += 1
+                continue
+            else:
+                self.counts['updated'] += 1
+            changed.append(MenuItem(title=title, price=price, featured=featured, category_id=values[2]))
+        MenuItem.objects.bulk_create(
+            changed, update_conflicts=True, unique_fields=['title'], update_fields=['price', 'featured', 'category'],
+        )
+
+    def sync_categories(self, names):
+        """
+        Upsert the batch's categories on slug and return {slug: id}. Names
+        left blank keep the stored name, or default to the slug for new ones.
+        """
+        wanted = {slug for slug, name in names.items() if slug not in self.categories or (name and name != self.categories[slug][1])}
+        if wanted:
+            for pk, slug, name in Category.objects.filter(slug__in=wanted).values_list('id', 'slug', 'name'):
+                self.categories[slug] = (pk, name)
+            changed = []
+            for slug in wanted:
+                name = names[slug]
+                if slug not in self.categories:
+                    self.counts['categories_inserted'] += 1
+                    changed.append(Category(slug=slug, name=name or slug))
+                elif name and name != self.categories[slug][1]:
+                    self.counts['categories_updated'] += 1
+                    changed.append(Category(slug=slug, name=name))
+            if changed:
+                Category.objects.bulk_create(changed, update_conflicts=True, unique_fields=['slug'], update_fields=['name'])
+                for pk, slug, name in Category.objects.filter(slug__in=[c.slug for c in changed]).values_list('id', 'slug', 'name'):
+                    self.categories[slug] = (pk, name)
+        return {slug: self.categories[slug][0] for slug in names}
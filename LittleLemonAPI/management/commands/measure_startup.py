@@ -0,0 +1,96 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ['LittleLemon.settings', 'LittleLemon.settings_api']
+
+# Run in a fresh interpreter per sample: boot Django the way a WSGI worker
+# does, load every view through the URLconf and answer one request that needs
+# no database (an unauthenticated API call), then report timings and peak RSS.
+WORKER = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().reverse_dict
+urls = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/categories', 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'HTTP_ACCEPT': 'application/json', 'wsgi.url_scheme': 'http',
+    'wsgi.input': sys.stdin.buffer, 'wsgi.errors': sys.stderr,
+}
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup - start) * 1000,
+    'urls_ms': (urls - setup) * 1000,
+    'first_request_ms': (done - urls) * 1000,
+    'status': statuses[0],
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+}))
+'''
+
+METRICS = ['cold_start_ms', 'setup_ms', 'urls_ms', 'first_request_ms', 'max_rss_mb', 'modules']
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure worker cold start for each settings profile: interpreter to first '
+        'response, django.setup(), URLconf and first request time, peak RSS and '
+        'modules imported. Medians over --runs fresh processes.'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', dest='profiles', help=f'settings module; default {" and ".join(PROFILES)}')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--output', help='also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or PROFILES
+        results = {profile: self.measure(profile, options['runs']) for profile in profiles}
+
+        self.stdout.write(f'{"profile":28}' + ''.join(f'{metric:>18}' for metric in METRICS))
+        for profile, result in results.items():
+            self.stdout.write(f'{profile:28}' + ''.join(f'{result[metric]:18.1f}' for metric in METRICS))
+        if len(results) > 1:
+            baseline, *others = results.values()
+            for profile, result in zip(profiles[1:], others):
+                self.stdout.write(self.style.SUCCESS(
+                    f'{profile} vs {profiles[0]}: cold start {result["cold_start_ms"] - baseline["cold_start_ms"]:+.1f} ms, '
+                    f'RSS {result["max_rss_mb"] - baseline["max_rss_mb"]:+.1f} MB, '
+                    f'{result["modules"] - baseline["modules"]:+.0f} modules'
+                ))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def measure(self, profile, runs):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            worker = subprocess.run(
+                [sys.executable, '-c', WORKER], cwd=settings.BASE_DIR, env=env,
+                stdin=subprocess.DEVNULL, capture_output=True, text=True,
+            )
+            elapsed = time.perf_counter() - start
+            if worker.returncode:
+                raise CommandError(f'{profile} failed to start:\n{worker.stderr}')
+            sample = json.loads(worker.stdout.strip().splitlines()[-1])
+            sample['cold_start_ms'] = elapsed * 1000
+            samples.append(sample)
+        result = {metric: statistics.median(sample[metric] for sample in samples) for metric in METRICS}
+        result['status'] = samples[-1]['status']
+        return result
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from LittleLemonAPI import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups from Order and OrderItem'
+
+    def handle(self, *args, **options):
+        days = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {days} day(s)'))
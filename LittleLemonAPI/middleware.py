@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .instrumentation import current_metrics, recording
+
+logger = logging.getLogger('LittleLemonAPI.requests')
+
+
+class RequestMetricsMiddleware:
+    """
+    Record SQL, serializer and render time for every request, answer with a
+    Server-Timing header and log requests slower than SLOW_REQUEST_MS as one
+    JSON line. Removed from the stack entirely unless REQUEST_METRICS is on.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with recording() as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        with recording() as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after this hook; time it up to the post-render callback
+        metrics = current_metrics.get()
+        if metrics is not None:
+            start = time.perf_counter()
+            sql_time = metrics.sql_time
+
+            def rendered(response):
+                metrics.timings['render'] += time.perf_counter() - start - (metrics.sql_time - sql_time)
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, metrics):
+        response['Server-Timing'] = metrics.server_timing()
+        if metrics.elapsed() * 1000 >= self.slow_ms:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                **metrics.as_dict(),
+            }))
+        return response
+
+
+# scope key of the asyncio.Event that DisconnectWatcher sets
+DISCONNECTED = 'littlelemon.disconnected'
+
+
+class DisconnectWatcher:
+    """
+    ASGI middleware that tells streaming views when the client goes away.
+    Django 4.2 stops calling receive() once the request body is read, so a
+    long response never sees http.disconnect; this keeps listening after the
+    body and sets scope['littlelemon.disconnected'] when it arrives.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        disconnected = asyncio.Event()
+        scope = dict(scope, **{DISCONNECTED: disconnected})
+        listener = None
+
+        async def listen():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        async def receive_body():
+            nonlocal listener
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+            elif not message.get('more_body', False):
+                # Django reads no further, the rest of the messages are ours
+                listener = asyncio.ensure_future(listen())
+            return message
+
+        try:
+            await self.app(scope, receive_body, send)
+        finally:
+            if listener is not None:
+                listener.cancel()
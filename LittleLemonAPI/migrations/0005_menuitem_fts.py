@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# SQLite FTS5 index over menu item titles and category names, kept in sync by
+# triggers so ORM saves, bulk operations and QuerySet.update() are all covered.
+# Other databases skip it and ?search= keeps using SearchFilter.
+
+FORWARD = [
+    """
+    CREATE VIRTUAL TABLE "LittleLemonAPI_menuitem_fts" USING fts5(
+        title, category, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER "LittleLemonAPI_menuitem_fts_ai" AFTER INSERT ON "LittleLemonAPI_menuitem" BEGIN
+        INSERT INTO "LittleLemonAPI_menuitem_fts" (rowid, title, category)
+        SELECT new.id, new.title, name FROM "LittleLemonAPI_category" WHERE id = new.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER "LittleLemonAPI_menuitem_fts_ad" AFTER DELETE ON "LittleLemonAPI_menuitem" BEGIN
+        DELETE FROM "LittleLemonAPI_menuitem_fts" WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER "LittleLemonAPI_menuitem_fts_au" AFTER UPDATE OF title, category_id ON "LittleLemonAPI_menuitem" BEGIN
+        DELETE FROM "LittleLemonAPI_menuitem_fts" WHERE rowid = old.id;
+        INSERT INTO "LittleLemonAPI_menuitem_fts" (rowid, title, category)
+        SELECT new.id, new.title, name FROM "LittleLemonAPI_category" WHERE id = new.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER "LittleLemonAPI_category_fts_au" AFTER UPDATE OF name ON "LittleLemonAPI_category" BEGIN
+        UPDATE "LittleLemonAPI_menuitem_fts" SET category = new.name
+        WHERE rowid IN (SELECT id FROM "LittleLemonAPI_menuitem" WHERE category_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO "LittleLemonAPI_menuitem_fts" (rowid, title, category)
+    SELECT m.id, m.title, c.name FROM "LittleLemonAPI_menuitem" m
+    JOIN "LittleLemonAPI_category" c ON c.id = m.category_id
+    """,
+]
+
+BACKWARD = [
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_category_fts_au"',
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_menuitem_fts_au"',
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_menuitem_fts_ad"',
+    'DROP TRIGGER IF EXISTS "LittleLemonAPI_menuitem_fts_ai"',
+    'DROP TABLE IF EXISTS "LittleLemonAPI_menuitem_fts"',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0004_alter_order_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(BACKWARD)),
+    ]
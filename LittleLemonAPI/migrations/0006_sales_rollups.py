@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-18 16:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0005_menuitem_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyMenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('menuitem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='LittleLemonAPI.menuitem')),
+            ],
+            options={
+                'unique_together': {('date', 'menuitem')},
+            },
+        ),
+    ]
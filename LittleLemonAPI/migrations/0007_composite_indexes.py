@@ -0,0 +1,25 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0006_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['category', 'price'], name='menuitem_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_crew', 'date'], name='order_crew_date_idx'),
+        ),
+    ]
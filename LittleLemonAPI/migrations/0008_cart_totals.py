@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    # totals for the carts that exist already; carts.py keeps them up to date afterwards
+    Cart = apps.get_model('LittleLemonAPI', 'Cart')
+    CartTotal = apps.get_model('LittleLemonAPI', 'CartTotal')
+    line_total = models.ExpressionWrapper(models.F('unit_price') * models.F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+    CartTotal.objects.bulk_create((
+        CartTotal(user_id=row['user'], subtotal=row['subtotal'], item_count=row['item_count'])
+        for row in Cart.objects.values('user').annotate(subtotal=models.Sum(line_total), item_count=models.Sum('quantity')).order_by()
+    ), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('LittleLemonAPI', '0007_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartTotal',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('item_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('LittleLemonAPI', '0009_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.BooleanField(default=True)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('date', models.DateField()),
+                ('items', models.JSONField(default=list)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('delivery_crew', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
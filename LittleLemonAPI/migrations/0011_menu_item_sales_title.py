@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_titles(apps, schema_editor):
+    DailyMenuItemSales = apps.get_model('LittleLemonAPI', 'DailyMenuItemSales')
+    MenuItem = apps.get_model('LittleLemonAPI', 'MenuItem')
+    DailyMenuItemSales.objects.update(title=models.Subquery(MenuItem.objects.filter(id=models.OuterRef('menuitem_id')).values('title')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0010_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailymenuitemsales',
+            name='title',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_titles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dailymenuitemsales',
+            name='menuitem',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='LittleLemonAPI.menuitem'),
+        ),
+    ]
@@ -15,6 +15,12 @@ class MenuItem(models.Model):
     featured = models.BooleanField(default=False)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
 
+    class Meta:
+        indexes = [
+            # menu filtered by category and a price range
+            models.Index(fields=['category', 'price'], name='menuitem_category_price_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -39,6 +45,16 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True, auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # a customer's orders, newest first
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+            # a delivery crew's orders (or, with NULL, the unassigned ones) by date. status is
+            # left out: Django filters booleans as "NOT status", which SQLite cannot match to
+            # an index column, and a middle column would stop the index from sorting by date
+            models.Index(fields=['delivery_crew', 'date'], name='order_crew_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.user} - {self.date}'
 
@@ -54,3 +70,78 @@ class OrderItem(models.Model):
     def __str__(self):
         return f'{self.order} - {self.menuitem}'
 
+
+# A single row (id 1) counting catalog changes. LittleLemonAPI.cache keys cached
+# menu and category responses on it, so a bump from any process drops them everywhere
+class CatalogVersion(models.Model):
+    version = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return str(self.version)
+
+
+# Daily sales rollups, maintained by LittleLemonAPI.rollups as orders come and go
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.date} - {self.revenue}'
+
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    # kept, with the title it had, when the menu item is deleted
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True)
+    title = models.CharField(max_length=255)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['date', 'menuitem']
+
+    def __str__(self):
+        return f'{self.date} - {self.title}'
+
+# A customer's cart subtotal and item count, maintained by LittleLemonAPI.carts as lines change
+class CartTotal(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user} - {self.subtotal}'
+
+# The first response to a request sent with an Idempotency-Key header, replayed
+# to its retries by LittleLemonAPI.idempotency until it expires
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # sha256 of the method, path and body, so a key reused for another request is refused
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.SmallIntegerField()
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+    def __str__(self):
+        return f'{self.user} - {self.key}'
+
+# A delivered order moved out of Order/OrderItem by LittleLemonAPI.archive. It
+# keeps the order's id; its lines are packed into items as
+# [id, menuitem_id, quantity, unit_price, total] lists.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    delivery_crew = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True)
+    status = models.BooleanField(default=True)
+    total = models.DecimalField(max_digits=6, decimal_places=2)
+    date = models.DateField()
+    items = models.JSONField(default=list)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.user} - {self.date}'
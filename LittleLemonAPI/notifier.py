@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .models import Order
+
+
+def resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+class OrderNotifier:
+    """
+    In-process fan-out of order changes to the async watchers of
+    /api/orders/<pk>/events. Changes may be published from any thread. Each
+    watcher waits on a future of its own, so idle watchers cost no work at all.
+
+    Every change gets a version from one counter. A watcher takes the current
+    version before reading the order, then waits for anything newer, so a
+    change landing in between is not lost. Only changes made in this process
+    are seen.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.version = 0
+        # order id -> (version, payload) of its latest change
+        self.latest = OrderedDict()
+        # order id -> {(loop, future)}
+        self.waiters = {}
+        self.lock = threading.Lock()
+
+    def publish(self, order_id, payload):
+        with self.lock:
+            self.version += 1
+            change = self.latest[order_id] = (self.version, payload)
+            self.latest.move_to_end(order_id)
+            while len(self.latest) > self.max_entries:
+                self.latest.popitem(last=False)
+            waiters = self.waiters.pop(order_id, ())
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(resolve, future, change)
+
+    async def wait(self, order_id, after, timeout):
+        """
+        Return the (version, payload) of the first change to the order newer
+        than `after`, or None if there is none within timeout seconds.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self.lock:
+            change = self.latest.get(order_id)
+            if change and change[0] > after:
+                return change
+            self.waiters.setdefault(order_id, set()).add(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self.lock:
+                waiters = self.waiters.get(order_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self.waiters[order_id]
+
+
+order_notifier = OrderNotifier(getattr(settings, 'ORDER_NOTIFIER_MAX_ENTRIES', 10000))
+
+
+def order_payload(order):
+    # status may still be the raw request value ('0', 1, ...)
+    return {'id': order.id, 'status': Order._meta.get_field('status').to_python(order.status), 'delivery_crew': order.delivery_crew_id}
+
+
+def deleted_payload(order_id):
+    # the last change an order's watchers see
+    return {'id': order_id, 'deleted': True}
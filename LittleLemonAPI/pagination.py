@@ -0,0 +1,168 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator, EmptyPage, InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# page size of the page/perpage menu item list when ?perpage is left out
+MENU_ITEM_PAGE_SIZE = 20
+
+def menu_item_paginator(queryset, perpage):
+    # page/perpage semantics shared by MenuItemView and AsyncMenuItemView
+    return Paginator(queryset, perpage or MENU_ITEM_PAGE_SIZE)
+
+def menu_item_page(paginator, page):
+    try:
+        return paginator.page(page or 1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+    except InvalidPage:
+        raise NotFound('Invalid page.')
+
+class OrderPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'perpage'
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views: the count and the page are fetched
+        with the async ORM, then the usual next/previous links apply.
+        """
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        # async for (not aiterator) so prefetch_related lookups still run
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+class MenuItemCursorPagination(BasePagination):
+    """
+    Keyset pagination for menu items. Pages are addressed by an opaque cursor
+    holding the (value, id) of the last row seen, so every page is a single
+    indexed range scan with no COUNT and no OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'perpage'
+    page_size = 20
+    max_page_size = 100
+    # ordering keys that can be paginated, each backed by an index
+    keyset_fields = ['price', 'title']
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get('ordering', '')
+        first = ordering.split(',')[0].strip()
+        if first.lstrip('-') in self.keyset_fields + ['id']:
+            return first.lstrip('-'), first.startswith('-')
+        return 'id', False
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            # a tampered value would otherwise fail in the query
+            value = model._meta.get_field(self.field).to_python(data['v'])
+            if value is None:
+                raise ValueError('empty cursor value')
+            return value, int(data['id']), bool(data['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        value = getattr(item, self.field)
+        data = {'v': str(value), 'id': item.pk, 'r': reverse}
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([item async for item in self.get_page_queryset(queryset, request).aiterator()])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        The keyset-filtered and ordered queryset for the requested page, with
+        one extra row to tell whether another page follows.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field, descending = self.get_ordering(request)
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = cursor[2] if cursor else False
+
+        # walking backwards is the same scan in the opposite direction
+        backwards = descending != reverse
+        if cursor:
+            value, pk = cursor[0], cursor[1]
+            lookup = 'lt' if backwards else 'gt'
+            if self.field == 'id':
+                queryset = queryset.filter(**{f'id__{lookup}': pk})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__{lookup}': value}) |
+                    Q(**{self.field: value, f'id__{lookup}': pk})
+                )
+        prefix = '-' if backwards else ''
+        if self.field == 'id':
+            queryset = queryset.order_by(f'{prefix}id')
+        else:
+            queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        self.page_size = page_size
+        self.cursor = cursor
+        return queryset[:page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.cursor and self.cursor[2]:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
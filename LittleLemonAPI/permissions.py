@@ -1,13 +1,14 @@
 # Create a customized permission class for users with group managers
 
 from rest_framework.permissions import BasePermission
+from .roles import has_role, MANAGER, CUSTOMER, DELIVERY_CREW
 
 class IsManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='manager').exists()
+        return has_role(request, MANAGER)
 class IsCustomer(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='customer').exists()
+        return has_role(request, CUSTOMER)
 class IsDeliveryCrew(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='delivery-crew').exists()
\ No newline at end of file
+        return has_role(request, DELIVERY_CREW)
@@ -0,0 +1,27 @@
+from rest_framework import renderers
+
+
+class EncodedJSON(bytes):
+    """
+    The compact JSON rendering of .data, kept so a cached body is encoded once.
+    """
+    data = None
+
+
+def encode_json(data):
+    encoded = EncodedJSON(JSONRenderer().render(data))
+    encoded.data = data
+    return encoded
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    Sends response.encoded_json as is, rather than rendering response.data
+    again, unless the client asked for an indented body.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        encoded = getattr(renderer_context.get('response'), 'encoded_json', None)
+        if encoded is not None and self.get_indent(accepted_media_type, renderer_context) is None:
+            return bytes(encoded)
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MANAGER = 'manager'
+CUSTOMER = 'customer'
+DELIVERY_CREW = 'delivery-crew'
+
+
+def roles_cache_timeout():
+    # the cache is per process and invalidate_roles() only reaches this one,
+    # so another worker's role change is honoured here after at most this long
+    return getattr(settings, 'ROLES_CACHE_TIMEOUT', 5)
+
+
+def roles_cache_key(user_id):
+    return f'littlelemon:roles:{user_id}'
+
+
+def get_roles(user):
+    """
+    Return the set of group names for user, shared across requests through the
+    cache until user.groups changes in this process or ROLES_CACHE_TIMEOUT
+    seconds pass.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    key = roles_cache_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, roles, roles_cache_timeout())
+    return roles
+
+
+async def aget_roles(user):
+    """
+    get_roles for async views, loading from the database with the async ORM.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    key = roles_cache_key(user.pk)
+    roles = await cache.aget(key)
+    if roles is None:
+        roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+        await cache.aset(key, roles, roles_cache_timeout())
+    return roles
+
+
+def get_request_roles(request):
+    """
+    Roles of request.user, resolved once per request however many permission
+    classes and view branches ask for them.
+    """
+    roles = getattr(request, '_littlelemon_roles', None)
+    if roles is None:
+        roles = request._littlelemon_roles = get_roles(request.user)
+    return roles
+
+
+def has_role(request, role):
+    return role in get_request_roles(request)
+
+
+def invalidate_roles(*user_ids):
+    cache.delete_many([roles_cache_key(user_id) for user_id in user_ids])
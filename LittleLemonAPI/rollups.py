@@ -0,0 +1,94 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Count
+from .counters import increment
+from .models import MenuItem, Order, OrderItem, ArchivedOrder, DailySales, DailyMenuItemSales
+
+# Incremental maintenance of DailySales and DailyMenuItemSales. An order is
+# counted when it is created; revenue and item counts come from its lines as
+# they are inserted (signals, or add_items() after a bulk_create). Deleting an
+# order subtracts both; archiving it does not. rebuild() recomputes everything
+# from Order/OrderItem and ArchivedOrder.
+
+
+def add_order(order, sign=1, using='default'):
+    increment(DailySales, {'date': order.date}, using, order_count=sign)
+
+
+def add_items(date, items, sign=1, using='default'):
+    """
+    Count order lines sold on date; items are (menuitem_id, quantity, total).
+    Runs a fixed number of queries however many lines there are. The rollups
+    are written to the `using` database, the one the orders are in.
+    """
+    per_item = defaultdict(lambda: [0, Decimal(0)])
+    for menuitem_id, quantity, total in items:
+        per_item[menuitem_id][0] += sign * quantity
+        per_item[menuitem_id][1] += sign * total
+    if not per_item:
+        return
+    with transaction.atomic(using=using):
+        increment(
+            DailySales, {'date': date}, using,
+            revenue=sum(revenue for _, revenue in per_item.values()),
+            item_count=sum(quantity for quantity, _ in per_item.values()),
+        )
+        rows = DailyMenuItemSales.objects.using(using).select_for_update().filter(date=date, menuitem_id__in=per_item)
+        existing = {row.menuitem_id: row for row in rows}
+        for row in existing.values():
+            row.quantity += per_item[row.menuitem_id][0]
+            row.revenue += per_item[row.menuitem_id][1]
+        DailyMenuItemSales.objects.using(using).bulk_update(existing.values(), ['quantity', 'revenue'])
+        new = [menuitem_id for menuitem_id in per_item if menuitem_id not in existing]
+        if new:
+            titles = dict(MenuItem.objects.using(using).filter(id__in=new).values_list('id', 'title'))
+            DailyMenuItemSales.objects.using(using).bulk_create([
+                DailyMenuItemSales(date=date, menuitem_id=menuitem_id, title=titles[menuitem_id], quantity=per_item[menuitem_id][0], revenue=per_item[menuitem_id][1])
+                for menuitem_id in new
+            ])
+
+
+def remove_order(order, using='default'):
+    with transaction.atomic(using=using):
+        add_order(order, sign=-1, using=using)
+        items = OrderItem.objects.using(using).filter(order=order).values_list('menuitem_id', 'quantity', 'total')
+        add_items(order.date, items, sign=-1, using=using)
+
+
+def rebuild():
+    """
+    Recompute the rollups from live and archived orders. Menu item rows of
+    deleted menu items cannot be recomputed (archived lines keep only the
+    menu item id), so they are left as they are.
+    """
+    with transaction.atomic():
+        DailyMenuItemSales.objects.filter(menuitem__isnull=False).delete()
+        DailySales.objects.all().delete()
+        days = defaultdict(lambda: [0, Decimal(0), 0])
+        per_item = defaultdict(lambda: [0, Decimal(0)])
+        for row in Order.objects.values('date').annotate(order_count=Count('id')).order_by():
+            days[row['date']][0] += row['order_count']
+        for row in OrderItem.objects.values('order__date', 'menuitem_id').annotate(quantity=Sum('quantity'), revenue=Sum('total')).order_by():
+            days[row['order__date']][1] += row['revenue']
+            days[row['order__date']][2] += row['quantity']
+            per_item[row['order__date'], row['menuitem_id']][0] += row['quantity']
+            per_item[row['order__date'], row['menuitem_id']][1] += row['revenue']
+        for date, items in ArchivedOrder.objects.values_list('date', 'items').iterator(chunk_size=2000):
+            days[date][0] += 1
+            for _, menuitem_id, quantity, _, total in items:
+                days[date][1] += Decimal(total)
+                days[date][2] += quantity
+                per_item[date, menuitem_id][0] += quantity
+                per_item[date, menuitem_id][1] += Decimal(total)
+
+        DailySales.objects.bulk_create((
+            DailySales(date=date, order_count=order_count, revenue=revenue, item_count=item_count)
+            for date, (order_count, revenue, item_count) in days.items()
+        ), batch_size=500)
+        titles = dict(MenuItem.objects.values_list('id', 'title'))
+        DailyMenuItemSales.objects.bulk_create((
+            DailyMenuItemSales(date=date, menuitem_id=menuitem_id, title=titles[menuitem_id], quantity=quantity, revenue=revenue)
+            for (date, menuitem_id), (quantity, revenue) in per_item.items() if menuitem_id in titles
+        ), batch_size=500)
+    return len(days)
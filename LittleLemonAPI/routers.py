@@ -0,0 +1,43 @@
+from contextvars import ContextVar
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA = 'replica'
+
+# True while a safe request on a ReplicaReadMixin view may read from the replica
+replica_reads = ContextVar('littlelemon_replica_reads', default=False)
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the read-only 'replica' alias while replica_reads is set, and
+    every write to 'default'. The first write of a request pins the rest of it
+    to 'default' so it reads what it just wrote.
+    """
+    def db_for_read(self, model, **hints):
+        if replica_reads.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        replica_reads.set(False)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaReadMixin:
+    """
+    Route the ORM reads of safe (GET/HEAD/OPTIONS) requests to the replica.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        token = replica_reads.set(request.method in SAFE_METHODS)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
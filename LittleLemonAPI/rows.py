@@ -0,0 +1,114 @@
+from django.contrib.auth.models import Group, User
+from rest_framework.fields import DateTimeField
+from .models import Cart, OrderItem
+
+# Plain-dict versions of the list serializers, built from values_list() rows.
+# Each builder returns exactly what the matching serializer's .data holds
+# (same keys, same order, decimals and datetimes already formatted), so the
+# JSON rendered from either is byte for byte the same.
+
+CATEGORY_FIELDS = ('id', 'slug', 'name')
+MENU_ITEM_FIELDS = ('id', 'title', 'price', 'featured', 'category_id', 'category__slug', 'category__name')
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name')
+CART_FIELDS = ('id', 'quantity', 'unit_price', 'created_at', 'updated_at') + tuple(f'menuitem__{field}' for field in MENU_ITEM_FIELDS)
+ORDER_FIELDS = ('id', 'user_id', 'delivery_crew_id', 'status', 'total', 'date')
+ORDER_LINE_FIELDS = ('order_id', 'id', 'quantity', 'unit_price', 'total') + tuple(f'menuitem__{field}' for field in MENU_ITEM_FIELDS)
+
+_datetime = DateTimeField()
+
+
+def decimal(value):
+    # DecimalField(coerce_to_string=True); the database already quantizes
+    return '{:f}'.format(value)
+
+
+def category_rows(queryset):
+    return [{'id': pk, 'slug': slug, 'name': name} for pk, slug, name in queryset.values_list(*CATEGORY_FIELDS)]
+
+
+def menu_item(pk, title, price, featured, category_id, slug, name):
+    return {
+        'id': pk,
+        'title': title,
+        'price': decimal(price),
+        'featured': featured,
+        'category': {'id': category_id, 'slug': slug, 'name': name},
+    }
+
+
+def menu_item_rows(queryset):
+    return [menu_item(*row) for row in queryset.values_list(*MENU_ITEM_FIELDS)]
+
+
+def menu_item_row(item):
+    # for pages that are already model instances (the cursor paginator)
+    category = item.category
+    return menu_item(item.id, item.title, item.price, item.featured, category.id, category.slug, category.name)
+
+
+def user_rows(user_ids):
+    """
+    UserSerializer rows for user_ids, keyed by id, in two queries.
+    """
+    users = {
+        row[0]: dict(zip(USER_FIELDS, row), groups=[])
+        for row in User.objects.filter(id__in=user_ids).values_list(*USER_FIELDS)
+    }
+    # the same query prefetch_related('user__groups') runs, so groups keep its order
+    for user_id, group_id, name in Group.objects.filter(user__in=users).values_list('user', 'id', 'name'):
+        users[user_id]['groups'].append({'id': group_id, 'name': name})
+    return users
+
+
+def cart_lines(user):
+    # CartSerializer rows without the user, for responses that give it once
+    return [
+        {
+            'id': pk,
+            'menuitem': menu_item(*menuitem),
+            'menuitem_id': menuitem[0],
+            'quantity': quantity,
+            'unit_price': decimal(unit_price),
+            'created_at': _datetime.to_representation(created_at),
+            'updated_at': _datetime.to_representation(updated_at),
+        }
+        for pk, quantity, unit_price, created_at, updated_at, *menuitem in Cart.objects.filter(user=user).values_list(*CART_FIELDS)
+    ]
+
+
+def cart_rows(user):
+    lines = cart_lines(user)
+    if not lines:
+        return []
+    owner = user_rows([user.pk])[user.pk]
+    return [{'id': line.pop('id'), 'user': owner, **line} for line in lines]
+
+
+def order_rows(orders):
+    """
+    OrderListSerializer rows for a page of ORDER_FIELDS tuples.
+    """
+    if not orders:
+        return []
+    users = user_rows({order[1] for order in orders} | {order[2] for order in orders if order[2] is not None})
+    lines = {order[0]: [] for order in orders}
+    for order_id, pk, quantity, unit_price, total, *menuitem in OrderItem.objects.filter(order__in=lines).values_list(*ORDER_LINE_FIELDS):
+        lines[order_id].append({
+            'id': pk,
+            'menuitem': menu_item(*menuitem),
+            'quantity': quantity,
+            'unit_price': decimal(unit_price),
+            'total': decimal(total),
+        })
+    return [
+        {
+            'id': pk,
+            'user': users[user_id],
+            'delivery_crew': users[crew_id] if crew_id is not None else None,
+            'order_items': lines[pk],
+            'status': stts,
+            'total': decimal(total),
+            'date': date.isoformat(),
+        }
+        for pk, user_id, crew_id, stts, total, date in orders
+    ]
@@ -55,6 +55,42 @@ class CartSerializer(ModelSerializer):
             raise serializers.ValidationError('This item is already in the cart')
         return data
 
+class CartBatchItemSerializer(serializers.Serializer):
+    menuitem_id = serializers.IntegerField(min_value=1)
+    # 0 removes the line from the cart
+    quantity = serializers.IntegerField(min_value=0, max_value=32767)
+
+class CartBatchSerializer(serializers.Serializer):
+    items = CartBatchItemSerializer(many=True, allow_empty=False)
+
+class MenuItemBulkItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0, required=False)
+    featured = serializers.BooleanField(required=False)
+    def validate(self, data):
+        if 'price' not in data and 'featured' not in data:
+            raise serializers.ValidationError('Give a price, featured or both')
+        return data
+
+class CategoryRepriceSerializer(serializers.Serializer):
+    category_id = serializers.IntegerField(min_value=1)
+    # +10 raises every price in the category by 10%, -10 lowers it by 10%
+    percent = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=-99.99, max_value=999.99)
+
+class MenuItemBulkSerializer(serializers.Serializer):
+    # item prices override a category percentage for the same item
+    items = MenuItemBulkItemSerializer(many=True, required=False)
+    categories = CategoryRepriceSerializer(many=True, required=False)
+    def validate(self, data):
+        if not data.get('items') and not data.get('categories'):
+            raise serializers.ValidationError('Give items, categories or both')
+        return data
+
+class DispatchSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+    # usernames; every delivery crew member when left out
+    crew = serializers.ListField(child=serializers.CharField(), allow_empty=False, required=False)
+
 class OrderSerializer(ModelSerializer):
     user = UserSerializer(read_only=True)
     delivery_crew = UserSerializer(read_only=True)
@@ -69,3 +105,13 @@ class OrderItemSerializer(ModelSerializer):
         model = OrderItem
         fields = '__all__'
 
+# Order items nested under their order, so the parent order is not repeated per line
+class OrderLineSerializer(ModelSerializer):
+    menuitem = MenuItemSerializer(read_only=True)
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'menuitem', 'quantity', 'unit_price', 'total']
+
+class OrderListSerializer(OrderSerializer):
+    order_items = OrderLineSerializer(many=True, read_only=True, source='orderitem_set')
+
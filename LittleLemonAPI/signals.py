@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.contrib.auth.models import User, Group
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Category, MenuItem, Cart, Order, OrderItem
+from . import carts, rollups
+from .archive import archiving
+from .cache import bump_catalog_version
+from .notifier import order_notifier, order_payload, deleted_payload
+from .roles import invalidate_roles
+from .authentication import token_cache
+from rest_framework.authtoken.models import Token
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def catalog_changed(sender, **kwargs):
+    # bump after commit so no reader can cache pre-commit rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+@receiver(pre_delete, sender=MenuItem)
+def menu_item_deleted(sender, instance, **kwargs):
+    # the cascade deletes its cart lines without telling the cart totals
+    carts.remove_lines(Cart.objects.filter(menuitem=instance).values_list('user_id', 'quantity', 'unit_price'))
+
+@receiver(post_save, sender=Cart)
+def cart_line_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        # the fields may still hold raw request values ('2')
+        quantity = Cart._meta.get_field('quantity').to_python(instance.quantity)
+        unit_price = Cart._meta.get_field('unit_price').to_python(instance.unit_price)
+        carts.add_line(instance.user_id, quantity, unit_price)
+    else:
+        # the previous quantity and price are gone, so count the cart again
+        carts.recalculate(instance.user_id)
+
+@receiver(post_delete, sender=Cart)
+def cart_line_deleted(sender, instance, origin=None, **kwargs):
+    if carts.settling.get():
+        return
+    # cascades are covered elsewhere: menu_item_deleted subtracts the lines,
+    # and a deleted user takes their total along
+    if not (isinstance(origin, Cart) or getattr(origin, 'model', None) is Cart):
+        return
+    carts.add_line(instance.user_id, instance.quantity, instance.unit_price, sign=-1)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_roles(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        invalidate_roles(*pk_set)
+    elif action == 'pre_clear':
+        invalidate_roles(*instance.user_set.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # a rename or delete changes the role names of every member
+    invalidate_roles(*instance.user_set.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # djoser logout deletes the token; the next request must be rejected
+    token_cache.evict(instance.key)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    token_cache.evict_user(instance.pk)
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, using, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        # into the database the order went to, like the rest of the rollup writes
+        rollups.add_order(instance, using=using)
+    else:
+        # after commit, so watchers never see a change that is rolled back
+        payload = order_payload(instance)
+        transaction.on_commit(lambda: order_notifier.publish(instance.pk, payload), using=using)
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, created, using, raw=False, **kwargs):
+    if created and not raw:
+        # the fields may still hold raw values ('2', '8.00')
+        quantity = OrderItem._meta.get_field('quantity').to_python(instance.quantity)
+        total = OrderItem._meta.get_field('total').to_python(instance.total)
+        with transaction.atomic(using=using):
+            rollups.add_items(instance.order.date, [(instance.menuitem_id, quantity, total)], using=using)
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, using, **kwargs):
+    # archived orders are still sales
+    if archiving.get():
+        return
+    # items still exist here; the cascade deletes them afterwards
+    rollups.remove_order(instance, using=using)
+
+@receiver(post_delete, sender=Order)
+def order_removed(sender, instance, using, **kwargs):
+    # ends the order's event streams; the pk is cleared once the delete is done
+    order_id = instance.pk
+    transaction.on_commit(lambda: order_notifier.publish(order_id, deleted_payload(order_id)), using=using)
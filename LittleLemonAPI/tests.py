@@ -1,3 +1,1550 @@
-from django.test import TestCase
+from decimal import Decimal
+from datetime import timedelta
+import asyncio
+import base64
+import json
+import re
+import runpy
+import tempfile
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections, OperationalError
+from django.core.cache import cache
+from django.contrib.auth.models import User, Group
+from rest_framework.test import APIClient
+from django.test import AsyncClient
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_started, request_finished
+from django.db import close_old_connections
+from .models import Category, MenuItem, CatalogVersion, Cart, CartTotal, IdempotencyKey, ArchivedOrder, Order, OrderItem, DailySales, DailyMenuItemSales
+from django.core.management import call_command
+from django.utils import timezone
+from .cache import catalog_cache
+from .authentication import token_cache, CachedTokenAuthentication
+from .routers import ReadReplicaRouter, replica_reads
+from .filters import has_menu_fts
+from unittest import mock, skipUnless
+from .throttling import ThrottleStore, get_throttle_store
+from .instrumentation import recording
+from .middleware import DisconnectWatcher
+from .notifier import order_notifier
+from . import carts, idempotency
+from contextlib import contextmanager
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from .serializers import CategorySerializer, MenuItemSerializer, CartSerializer, OrderListSerializer
+from .urls import urlpatterns
+from .views import visible_orders, filter_menu_items
+from .roles import MANAGER, CUSTOMER, DELIVERY_CREW
 
 # Create your tests here.
+
+class LittleLemonMixin:
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.clear()
+        token_cache.clear()
+        throttle_settings = self.settings(THROTTLE_DB_PATH=settings.BASE_DIR / 'test_throttle.sqlite3')
+        throttle_settings.enable()
+        self.addCleanup(throttle_settings.disable)
+        get_throttle_store().reset()
+        self.client = APIClient()
+        self.manager_group = Group.objects.create(name='manager')
+        self.customer_group = Group.objects.create(name='customer')
+        self.crew_group = Group.objects.create(name='delivery-crew')
+        self.category = Category.objects.create(slug='mains', name='Mains')
+
+    @contextmanager
+    def assertQueryBudget(self, queries, duplicates=0):
+        # at most `queries` statements, and no statement repeated more than `duplicates` times over
+        with recording() as metrics:
+            yield metrics
+        self.assertLessEqual(metrics.queries, queries, f'{metrics.queries} queries, budget {queries}')
+        self.assertLessEqual(metrics.duplicates, duplicates, f'repeated: {metrics.most_repeated()}')
+
+    def make_user(self, username, group=None):
+        user = User.objects.create(username=username)
+        if group:
+            user.groups.add(group)
+        return user
+
+    def make_menu_item(self, title, price='5.00', category=None):
+        return MenuItem.objects.create(title=title, price=Decimal(price), category=category or self.category)
+
+    def make_order(self, user, items, delivery_crew=None):
+        order = Order.objects.create(user=user, delivery_crew=delivery_crew, total=0)
+        total = 0
+        for menuitem, quantity in items:
+            line_total = menuitem.price * quantity
+            OrderItem.objects.create(order=order, menuitem=menuitem, quantity=quantity, unit_price=menuitem.price, total=line_total)
+            total += line_total
+        order.total = total
+        order.save()
+        return order
+
+
+class LittleLemonTestCase(LittleLemonMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # the replica is a separate connection that cannot see this test's
+        # uncommitted transaction, so share the default one
+        self.addCleanup(connections.__setitem__, 'replica', connections['replica'])
+        connections['replica'] = connections['default']
+
+
+class OrderListTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.crew = self.make_user('crew', self.crew_group)
+        self.items = [self.make_menu_item(f'Dish {i}') for i in range(3)]
+
+    def add_orders(self, count):
+        for i in range(count):
+            customer = self.make_user(f'customer{Order.objects.count()}', self.customer_group)
+            self.make_order(customer, [(item, 2) for item in self.items], delivery_crew=self.crew)
+
+    def count_list_queries(self):
+        self.client.force_authenticate(self.manager)
+        # warm the role cache so only the listing itself is measured
+        self.client.get('/api/orders')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/orders')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_items_nested_without_repeating_order(self):
+        self.add_orders(1)
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/orders')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        order = response.data['results'][0]
+        self.assertEqual(len(order['order_items']), 3)
+        self.assertNotIn('order', order['order_items'][0])
+        self.assertEqual(order['order_items'][0]['menuitem']['category']['slug'], 'mains')
+
+    def test_query_count_is_flat(self):
+        self.add_orders(2)
+        small, _ = self.count_list_queries()
+        self.add_orders(15)
+        large, response = self.count_list_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['count'], 17)
+
+    def test_paginated(self):
+        self.add_orders(5)
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/orders', {'perpage': 2, 'page': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_customer_sees_only_own_orders(self):
+        self.add_orders(3)
+        customer = Order.objects.first().user
+        self.client.force_authenticate(customer)
+        response = self.client.get('/api/orders')
+        self.assertEqual(response.data['count'], 1)
+
+
+class RoleCacheTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.user = self.make_user('someone')
+        self.client.force_authenticate(self.manager)
+
+    def test_roles_cached_across_requests(self):
+        self.client.get('/api/categories')
+        with self.assertNumQueries(1):
+            # only the category listing itself
+            self.client.get('/api/categories')
+
+    def test_group_changes_invalidate(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/categories').status_code, 403)
+        self.user.groups.add(self.manager_group)
+        self.assertEqual(self.client.get('/api/categories').status_code, 200)
+        self.manager_group.user_set.remove(self.user)
+        self.assertEqual(self.client.get('/api/categories').status_code, 403)
+
+    def test_change_in_another_process_expires(self):
+        self.client.get('/api/categories')
+        # a removal this process hears nothing about: no m2m_changed signal
+        User.groups.through.objects.filter(user=self.manager).delete()
+        self.assertEqual(self.client.get('/api/categories').status_code, 200)
+        later = time.time() + settings.ROLES_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(self.client.get('/api/categories').status_code, 403)
+
+    def test_role_endpoints_invalidate(self):
+        self.client.post('/api/groups/manager/users', {'username': 'someone'})
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/categories').status_code, 200)
+        self.client.delete(f'/api/groups/manager/users/{self.user.id}')
+        self.assertEqual(self.client.get('/api/categories').status_code, 403)
+
+
+class TokenCacheTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.token = Token.objects.create(user=self.manager)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_needs_no_query(self):
+        self.client.get('/api/categories')
+        with self.assertNumQueries(1):
+            # only the category listing itself
+            self.assertEqual(self.client.get('/api/categories').status_code, 200)
+
+    def test_logout_evicts(self):
+        self.client.get('/api/categories')
+        self.assertEqual(self.client.post('/auth/token/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/api/categories').status_code, 401)
+
+    def test_deactivated_user_evicted(self):
+        self.client.get('/api/categories')
+        self.manager.is_active = False
+        self.manager.save()
+        self.assertEqual(self.client.get('/api/categories').status_code, 401)
+
+    def test_change_in_another_process_expires(self):
+        self.client.get('/api/categories')
+        # update() sends no post_save, as in a worker that did not handle the change
+        User.objects.filter(pk=self.manager.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/categories').status_code, 200)
+        later = time.monotonic() + settings.TOKEN_CACHE_TTL + 1
+        with mock.patch('time.monotonic', return_value=later):
+            self.assertEqual(self.client.get('/api/categories').status_code, 401)
+
+    def test_requests_get_their_own_user(self):
+        first, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        second, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual(first, second)
+        self.assertIsNot(first._state, second._state)
+        first._state.fields_cache['marker'] = True
+        self.assertNotIn('marker', second._state.fields_cache)
+
+
+class SQLiteBackendTest(LittleLemonTestCase):
+    expected = {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'cache_size': -64000, 'mmap_size': 268435456}
+
+    def pragmas(self, alias):
+        values = {}
+        with connections[alias].cursor() as cursor:
+            for pragma in self.expected:
+                cursor.execute(f'PRAGMA {pragma}')
+                values[pragma] = cursor.fetchone()[0]
+        return values
+
+    @contextmanager
+    def alias(self, name, base, **overrides):
+        connections.settings[name] = dict(connections.settings[base], **overrides)
+        try:
+            yield connections[name]
+        finally:
+            connections[name].close()
+            del connections[name]
+            del connections.settings[name]
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.pragmas('default'), self.expected)
+
+    def test_replica_is_read_only(self):
+        # the test runner points the mirror at the test database, so read the settings as written
+        configured = runpy.run_module('LittleLemon.settings')['DATABASES']
+        replica_name = configured['replica']['NAME']
+        self.assertTrue(replica_name.endswith('?mode=ro'))
+        with tempfile.TemporaryDirectory() as workdir:
+            path = f'{workdir}/db.sqlite3'
+            with self.alias('default_file', 'default', NAME=path) as primary:
+                with primary.cursor() as cursor:
+                    cursor.execute('CREATE TABLE t (id integer)')
+                # the replica opens the same file the way settings.py does
+                with self.alias('replica_file', 'replica', NAME=replica_name.replace(str(configured['default']['NAME']), path)) as replica:
+                    self.assertEqual(self.pragmas('replica_file'), self.expected)
+                    with self.assertRaisesRegex(OperationalError, 'readonly'):
+                        with replica.cursor() as cursor:
+                            cursor.execute('INSERT INTO t VALUES (1)')
+
+
+class ReplicaRoutingTest(LittleLemonMixin, TransactionTestCase):
+    def test_router(self):
+        router = ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(MenuItem))
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(MenuItem), 'replica')
+            self.assertEqual(router.db_for_write(MenuItem), 'default')
+            # reads after a write stay on the primary
+            self.assertIsNone(router.db_for_read(MenuItem))
+        finally:
+            replica_reads.reset(token)
+
+    def test_safe_requests_read_from_replica(self):
+        self.client.force_authenticate(self.make_user('manager', self.manager_group))
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/api/categories')
+        self.assertEqual(response.data[0]['slug'], 'mains')
+        self.assertTrue(replica.captured_queries)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.post('/api/categories', {'slug': 'drinks', 'name': 'Drinks'})
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(replica.captured_queries)
+        self.assertTrue(Category.objects.using('replica').filter(slug='drinks').exists())
+
+
+class MenuSearchTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('customer', self.customer_group))
+        self.desserts = Category.objects.create(slug='desserts', name='Desserts')
+        self.make_menu_item('Lemon Dessert', category=self.desserts)
+        self.make_menu_item('Lemon Chicken')
+        self.make_menu_item('Greek Salad')
+        self.make_menu_item('Lemonade Sorbet', category=self.desserts)
+
+    def search(self, term, **params):
+        catalog_cache.clear()
+        response = self.client.get('/api/menu-items', dict(params, search=term, perpage=10, page=1))
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data]
+
+    def test_uses_fts_index(self):
+        self.assertTrue(has_menu_fts('default'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.search('lemo')
+        self.assertTrue(any('MATCH' in query['sql'] for query in ctx.captured_queries))
+
+    def test_prefix_terms_across_title_and_category(self):
+        self.assertEqual(sorted(self.search('lemon')), ['Lemon Chicken', 'Lemon Dessert', 'Lemonade Sorbet'])
+        self.assertEqual(sorted(self.search('lem dess')), ['Lemon Dessert', 'Lemonade Sorbet'])
+        self.assertEqual(self.search('greek', ordering='title'), ['Greek Salad'])
+
+    def test_index_follows_writes(self):
+        item = MenuItem.objects.get(title='Greek Salad')
+        item.title = 'Caesar Salad'
+        item.save()
+        self.assertEqual(self.search('greek'), [])
+        self.assertEqual(self.search('caesar'), ['Caesar Salad'])
+        Category.objects.filter(id=self.desserts.id).update(name='Sweets')
+        self.assertEqual(sorted(self.search('sweet')), ['Lemon Dessert', 'Lemonade Sorbet'])
+        MenuItem.objects.filter(title='Lemon Chicken').delete()
+        self.assertEqual(sorted(self.search('chicken')), [])
+
+    def test_falls_back_without_index(self):
+        with mock.patch.dict('LittleLemonAPI.filters._fts_tables', {'default': False, 'replica': False}):
+            # SearchFilter matches substrings
+            self.assertEqual(self.search('alad'), ['Greek Salad'])
+
+
+class ThrottleTest(LittleLemonTestCase):
+    def test_user_limit(self):
+        self.client.force_authenticate(self.make_user('manager', self.manager_group))
+        codes = [self.client.get('/api/categories').status_code for _ in range(11)]
+        self.assertEqual(codes, [200] * 10 + [429])
+
+    def test_store_shared_between_connections(self):
+        # two stores on one file stand in for two worker processes
+        path = settings.THROTTLE_DB_PATH
+        first, second = ThrottleStore(path), ThrottleStore(path)
+        self.assertTrue(first.take('k', 2, 60, 1000.0)[0])
+        self.assertTrue(second.take('k', 2, 60, 1000.0)[0])
+        self.assertFalse(first.take('k', 2, 60, 1000.0)[0])
+        # one token refills every 30 seconds
+        self.assertTrue(second.take('k', 2, 60, 1030.0)[0])
+        self.assertFalse(first.take('k', 2, 60, 1030.0)[0])
+
+
+class MenuItemCursorTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('customer', self.customer_group))
+        self.drinks = Category.objects.create(slug='drinks', name='Drinks')
+        for i in range(7):
+            self.make_menu_item(f'Main {i}', price=f'{5 + i % 3}.00')
+            self.make_menu_item(f'Drink {i}', price='2.00', category=self.drinks)
+
+    def walk(self, params):
+        titles = []
+        response = self.client.get('/api/menu-items', dict(params, pagination='cursor', perpage=3))
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            titles += [item['title'] for item in response.data['results']]
+            if not response.data['next']:
+                return titles, response
+            response = self.client.get(response.data['next'])
+
+    def test_walks_every_item_once_in_price_order(self):
+        titles, _ = self.walk({'category': self.category.id, 'ordering': '-price'})
+        expected = list(MenuItem.objects.filter(category=self.category).order_by('-price', '-id').values_list('title', flat=True))
+        self.assertEqual(titles, expected)
+
+    def test_combines_with_filters(self):
+        titles, _ = self.walk({'price_from': '6.00', 'price_to': '6.00', 'ordering': 'title'})
+        self.assertEqual(titles, sorted(MenuItem.objects.filter(price='6.00').values_list('title', flat=True)))
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get('/api/menu-items', {'pagination': 'cursor', 'perpage': 4, 'ordering': 'title'})
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/menu-items', {'pagination': 'cursor', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+        for data in [{'v': 'abc', 'id': 1, 'r': False}, {'v': None, 'id': 1, 'r': False}, [1]]:
+            cursor = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+            response = self.client.get('/api/menu-items', {'pagination': 'cursor', 'ordering': 'price', 'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_descending_id(self):
+        titles, _ = self.walk({'ordering': '-id'})
+        self.assertEqual(titles, list(MenuItem.objects.order_by('-id').values_list('title', flat=True)))
+
+
+class CatalogCacheTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('customer', self.customer_group))
+        self.item = self.make_menu_item('Bruschetta')
+        self.url = f'/api/menu-items/{self.item.id}'
+
+    def test_repeat_reads_skip_the_database(self):
+        first = self.client.get('/api/menu-items', {'perpage': 5, 'page': 1})
+        # just the shared catalog version
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/menu-items', {'perpage': 5, 'page': 1})
+        self.assertEqual(first.data, second.data)
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).data['title'], 'Bruschetta')
+
+    def test_bump_from_another_process(self):
+        self.client.get(self.url)
+        # another worker's write: this process's signals and caches see nothing of it
+        MenuItem.objects.filter(id=self.item.id).update(title='Greek Salad')
+        CatalogVersion.objects.update_or_create(pk=1, defaults={'version': 5})
+        self.assertEqual(self.client.get(self.url).data['title'], 'Greek Salad')
+
+    def test_save_bumps_version(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.title = 'Greek Salad'
+            self.item.save()
+        self.assertEqual(self.client.get(self.url).data['title'], 'Greek Salad')
+
+    def test_category_change_bumps_version(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Starters'
+            self.category.save()
+        self.assertEqual(self.client.get(self.url).data['category']['name'], 'Starters')
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+
+class MenuItemBulkTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('manager', self.manager_group))
+        self.drinks = Category.objects.create(slug='drinks', name='Drinks')
+        self.items = [self.make_menu_item(f'Dish {i}', price='10.00') for i in range(3)]
+        self.lemonade = self.make_menu_item('Lemonade', price='2.35', category=self.drinks)
+        self.tea = self.make_menu_item('Tea', price='9000.00', category=self.drinks)
+
+    def post(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/menu-items/bulk', data, format='json')
+
+    def prices(self):
+        return dict(MenuItem.objects.values_list('title', 'price'))
+
+    def test_prices_featured_and_percentages(self):
+        response = self.post({
+            'items': [
+                {'id': self.items[0].id, 'price': '12.50'},
+                {'id': self.items[1].id, 'featured': True},
+                {'id': self.items[2].id, 'price': '10.00'},
+                {'id': self.tea.id, 'price': '3.00'},
+                {'id': 999, 'price': '1.00'},
+            ],
+            'categories': [{'category_id': self.drinks.id, 'percent': '10'}, {'category_id': 998, 'percent': '5'}],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(response.data['unchanged'], 1)
+        self.assertEqual(response.data['not_found'], 1)
+        self.assertEqual([(item['id'], item['status']) for item in response.data['items']], [
+            (self.items[0].id, 'updated'), (self.items[1].id, 'updated'), (self.items[2].id, 'unchanged'),
+            (self.tea.id, 'updated'), (999, 'not_found'), (self.lemonade.id, 'updated'),
+        ])
+        self.assertEqual(response.data['categories'], [
+            {'category_id': self.drinks.id, 'status': 'updated', 'items': 2},
+            {'category_id': 998, 'status': 'not_found', 'items': 0},
+        ])
+        prices = self.prices()
+        self.assertEqual(prices['Dish 0'], Decimal('12.50'))
+        # an item's own price wins over its category's percentage
+        self.assertEqual(prices['Tea'], Decimal('3.00'))
+        self.assertEqual(prices['Lemonade'], Decimal('2.59'))
+        self.assertTrue(MenuItem.objects.get(id=self.items[1].id).featured)
+
+    def test_out_of_range_price_is_not_applied(self):
+        wine = Category.objects.create(slug='wine', name='Wine')
+        self.make_menu_item('Vintage', price='9500.00', category=wine)
+        response = self.post({'categories': [{'category_id': self.drinks.id, 'percent': '20'}, {'category_id': wine.id, 'percent': '20'}]})
+        outcomes = {item['id']: item for item in response.data['items']}
+        self.assertEqual(outcomes[self.tea.id]['status'], 'invalid')
+        self.assertEqual(outcomes[self.tea.id]['price'], '9000.00')
+        # a category none of whose items could be repriced is not reported as updated
+        self.assertEqual(response.data['categories'], [
+            {'category_id': self.drinks.id, 'status': 'updated', 'items': 2},
+            {'category_id': wine.id, 'status': 'invalid', 'items': 1},
+        ])
+        self.assertEqual(self.prices()['Tea'], Decimal('9000.00'))
+        self.assertEqual(self.prices()['Lemonade'], Decimal('2.82'))
+
+    def test_catalog_cache_dropped_once(self):
+        self.client.get(f'/api/menu-items/{self.lemonade.id}')
+        with mock.patch('LittleLemonAPI.views.bump_catalog_version') as bump:
+            self.post({'categories': [{'category_id': self.category.id, 'percent': '-50'}], 'items': [{'id': self.lemonade.id, 'featured': True}]})
+        bump.assert_called_once()
+        self.post({'items': [{'id': self.lemonade.id, 'price': '3.00'}]})
+        self.assertEqual(self.client.get(f'/api/menu-items/{self.lemonade.id}').data['price'], '3.00')
+
+    def test_query_count_independent_of_item_count(self):
+        # warm the role cache and create the catalog version row
+        self.post({'items': [{'id': self.lemonade.id, 'featured': True}]})
+        counts = []
+        for count in [1, 3]:
+            with CaptureQueriesContext(connection) as ctx:
+                self.post({'items': [{'id': item.id, 'price': f'{count}.00'} for item in self.items[:count]]})
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.post({}).status_code, 400)
+        self.assertEqual(self.post({'items': [{'id': self.items[0].id}]}).status_code, 400)
+        self.assertEqual(self.post({'items': [{'id': self.items[0].id, 'price': '-1'}]}).status_code, 400)
+        self.assertEqual(self.post({'categories': [{'category_id': self.drinks.id, 'percent': '-100'}]}).status_code, 400)
+
+    def test_managers_only(self):
+        self.client.force_authenticate(self.make_user('customer', self.customer_group))
+        self.assertEqual(self.post({'items': [{'id': self.items[0].id, 'price': '1.00'}]}).status_code, 403)
+
+
+class CheckoutTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.client.force_authenticate(self.customer)
+        for i in range(4):
+            item = self.make_menu_item(f'Dish {i}', price=f'{i + 1}.50')
+            Cart.objects.create(user=self.customer, menuitem=item, quantity=i + 1, unit_price=item.price)
+
+    def test_checkout_moves_cart_to_order(self):
+        response = self.client.post('/api/orders')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.total, Decimal('1.50') + Decimal('5.00') + Decimal('10.50') + Decimal('18.00'))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 4)
+        self.assertEqual(OrderItem.objects.get(order=order, menuitem__title='Dish 3').total, Decimal('18.00'))
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+
+    def test_query_count_independent_of_cart_size(self):
+        small = self.make_user('small', self.customer_group)
+        warm = self.make_user('warm', self.customer_group)
+        for item in MenuItem.objects.all():
+            Cart.objects.create(user=warm, menuitem=item, quantity=1, unit_price=item.price)
+        item = MenuItem.objects.first()
+        Cart.objects.create(user=small, menuitem=item, quantity=1, unit_price=item.price)
+        counts = []
+        # the first checkout of the day creates the sales rollup rows
+        for user in [warm, small, self.customer]:
+            self.client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.post('/api/orders').status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[1], counts[2])
+
+    def test_empty_cart(self):
+        self.client.post('/api/orders')
+        response = self.client.post('/api/orders')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class ConcurrentCheckoutTest(LittleLemonMixin, TransactionTestCase):
+    def test_parallel_checkouts_create_one_order(self):
+        customer = self.make_user('customer', self.customer_group)
+        for i in range(5):
+            item = self.make_menu_item(f'Dish {i}')
+            Cart.objects.create(user=customer, menuitem=item, quantity=2, unit_price=item.price)
+        barrier = threading.Barrier(6)
+        codes = []
+
+        def checkout():
+            client = APIClient()
+            client.force_authenticate(customer)
+            barrier.wait()
+            try:
+                codes.append(client.post('/api/orders').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(codes), [201] + [400] * 5)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 5)
+
+
+class CartBatchTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.client.force_authenticate(self.customer)
+        self.items = [self.make_menu_item(f'Dish {i}', price=f'{i + 1}.00') for i in range(5)]
+        Cart.objects.create(user=self.customer, menuitem=self.items[0], quantity=1, unit_price=self.items[0].price)
+        Cart.objects.create(user=self.customer, menuitem=self.items[1], quantity=1, unit_price=self.items[1].price)
+
+    def post(self, items):
+        return self.client.post('/api/cart/menu-items/batch', {'items': items}, format='json')
+
+    def test_adds_updates_and_removes(self):
+        response = self.post([
+            {'menuitem_id': self.items[0].id, 'quantity': 3},
+            {'menuitem_id': self.items[1].id, 'quantity': 0},
+            {'menuitem_id': self.items[2].id, 'quantity': 2},
+            {'menuitem_id': self.items[3].id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'updated': 3, 'removed': 1})
+        cart = dict(Cart.objects.filter(user=self.customer).values_list('menuitem__title', 'quantity'))
+        self.assertEqual(cart, {'Dish 0': 3, 'Dish 2': 2, 'Dish 3': 1})
+
+    def test_query_count_independent_of_batch_size(self):
+        items = self.items + [self.make_menu_item(f'Extra {i}') for i in range(15)]
+        # warm the role cache so both batches run the same queries
+        self.post([{'menuitem_id': items[4].id, 'quantity': 1}])
+
+        def count(batch):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post(batch).status_code, 200)
+            return len(ctx.captured_queries)
+
+        # each batch replaces some lines and removes others
+        small = count([{'menuitem_id': items[0].id, 'quantity': 2}, {'menuitem_id': items[1].id, 'quantity': 0}])
+        large = count([{'menuitem_id': item.id, 'quantity': 0 if i % 4 == 0 else 3} for i, item in enumerate(items)])
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 15)
+        self.assertEqual(small, large)
+
+    def test_unknown_menu_item(self):
+        response = self.post([{'menuitem_id': 999, 'quantity': 1}, {'menuitem_id': self.items[4].id, 'quantity': 1}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['menuitem_ids'], [999])
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 2)
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.post([{'menuitem_id': self.items[0].id, 'quantity': -1}]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+
+
+class CartTotalTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.client.force_authenticate(self.customer)
+        self.items = [self.make_menu_item(f'Dish {i}', price=f'{i + 1}.50') for i in range(4)]
+
+    def total(self):
+        return carts.summary(self.customer.pk)
+
+    def assertMaintained(self):
+        maintained = self.total()
+        carts.recalculate(self.customer.pk)
+        self.assertEqual(maintained, self.total())
+
+    def test_follows_cart_changes(self):
+        self.client.post('/api/cart/menu-items', {'menuitem_id': self.items[0].id, 'quantity': '2'})
+        self.assertEqual(self.total(), (Decimal('3.00'), 2))
+        self.client.post('/api/cart/menu-items/batch', {'items': [
+            {'menuitem_id': self.items[0].id, 'quantity': 1},
+            {'menuitem_id': self.items[1].id, 'quantity': 3},
+        ]}, format='json')
+        self.assertEqual(self.total(), (Decimal('9.00'), 4))
+        self.assertMaintained()
+        self.client.post('/api/cart/menu-items/batch', {'items': [{'menuitem_id': self.items[0].id, 'quantity': 0}]}, format='json')
+        self.assertEqual(self.total(), (Decimal('7.50'), 3))
+        self.assertMaintained()
+        self.client.post('/api/orders')
+        self.assertEqual(self.total(), (Decimal('0.00'), 0))
+
+    def test_menu_item_delete(self):
+        other = self.make_user('other', self.customer_group)
+        for user in [self.customer, other]:
+            Cart.objects.create(user=user, menuitem=self.items[2], quantity=2, unit_price=self.items[2].price)
+            Cart.objects.create(user=user, menuitem=self.items[3], quantity=1, unit_price=self.items[3].price)
+        self.items[3].delete()
+        self.assertEqual(self.total(), (Decimal('7.00'), 2))
+        self.assertEqual(carts.summary(other.pk), (Decimal('7.00'), 2))
+
+    def test_line_deletes(self):
+        lines = [Cart.objects.create(user=self.customer, menuitem=item, quantity=2, unit_price=item.price) for item in self.items]
+        self.assertEqual(self.total(), (Decimal('24.00'), 8))
+        # as the admin does: one line, then a selection as a queryset
+        lines[0].delete()
+        self.assertEqual(self.total(), (Decimal('21.00'), 6))
+        Cart.objects.filter(id__in=[lines[1].id, lines[2].id]).delete()
+        self.assertEqual(self.total(), (Decimal('9.00'), 2))
+        self.assertMaintained()
+        self.items[3].delete()
+        self.assertEqual(self.total(), (Decimal('0.00'), 0))
+
+    def test_user_delete(self):
+        Cart.objects.create(user=self.customer, menuitem=self.items[0], quantity=1, unit_price=self.items[0].price)
+        self.customer.delete()
+        self.assertFalse(CartTotal.objects.exists())
+
+    def test_summary(self):
+        for item in self.items[:2]:
+            Cart.objects.create(user=self.customer, menuitem=item, quantity=2, unit_price=item.price)
+        response = self.client.get('/api/cart/summary')
+        self.assertEqual(response.status_code, 200)
+        rows = self.client.get('/api/cart/menu-items').data
+        self.assertEqual(response.data['user'], rows[0]['user'])
+        self.assertEqual(response.data['lines'], [{key: value for key, value in row.items() if key != 'user'} for row in rows])
+        self.assertEqual(response.data['subtotal'], '8.00')
+        self.assertEqual(response.data['item_count'], 4)
+
+        badge = self.client.get('/api/cart/summary?lines=0')
+        self.assertEqual(badge.data, {'subtotal': '8.00', 'item_count': 4})
+
+    def test_empty_summary(self):
+        response = self.client.get('/api/cart/summary')
+        self.assertEqual(response.data['lines'], [])
+        self.assertEqual(response.data['subtotal'], '0.00')
+        self.assertFalse(CartTotal.objects.exists())
+
+    def test_summary_query_count_independent_of_cart_size(self):
+        self.client.get('/api/cart/summary')
+        counts = []
+        for item in self.items:
+            Cart.objects.create(user=self.customer, menuitem=item, quantity=1, unit_price=item.price)
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/api/cart/summary')
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1)
+
+
+class IdempotencyTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.client.force_authenticate(self.customer)
+        self.items = [self.make_menu_item(f'Dish {i}', price=f'{i + 1}.50') for i in range(2)]
+        Cart.objects.create(user=self.customer, menuitem=self.items[0], quantity=2, unit_price=self.items[0].price)
+
+    def checkout(self, key):
+        return self.client.post('/api/orders', HTTP_IDEMPOTENCY_KEY=key)
+
+    def add_to_cart(self, key, quantity=1):
+        return self.client.post('/api/cart/menu-items', {'menuitem_id': self.items[1].id, 'quantity': quantity}, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_checkout_replays_the_order(self):
+        first = self.checkout('checkout-1')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self.checkout('checkout-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        touched = ' '.join(query['sql'] for query in ctx.captured_queries)
+        for table in ['littlelemonapi_order', 'littlelemonapi_orderitem', 'littlelemonapi_cart']:
+            self.assertNotRegex(touched.lower(), rf'"{table}"')
+
+    def test_retried_cart_add(self):
+        self.assertEqual(self.add_to_cart('add-1').status_code, 201)
+        self.assertEqual(self.add_to_cart('add-1').status_code, 201)
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 2)
+        # without a key the duplicate is refused as before
+        self.assertEqual(self.client.post('/api/cart/menu-items', {'menuitem_id': self.items[1].id, 'quantity': 1}).status_code, 400)
+
+    def test_key_reused_for_another_request(self):
+        self.add_to_cart('add-1')
+        self.assertEqual(self.add_to_cart('add-1', quantity=5).status_code, 422)
+        self.assertEqual(Cart.objects.get(user=self.customer, menuitem=self.items[1]).quantity, 1)
+
+    def test_keys_are_per_user(self):
+        self.checkout('shared')
+        other = self.make_user('other', self.customer_group)
+        Cart.objects.create(user=other, menuitem=self.items[1], quantity=1, unit_price=self.items[1].price)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.checkout('shared').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_failed_request_is_not_stored(self):
+        Cart.objects.all().delete()
+        self.assertEqual(self.checkout('checkout-1').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        Cart.objects.create(user=self.customer, menuitem=self.items[1], quantity=1, unit_price=self.items[1].price)
+        self.assertEqual(self.checkout('checkout-1').status_code, 201)
+
+    def test_invalid_key(self):
+        self.assertEqual(self.checkout('x' * 256).status_code, 400)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_expired_key_runs_again(self):
+        self.add_to_cart('add-1')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        Cart.objects.filter(menuitem=self.items[1]).delete()
+        self.add_to_cart('add-1')
+        self.assertEqual(IdempotencyKey.objects.get().created_at.date(), timezone.now().date())
+        self.assertTrue(Cart.objects.filter(menuitem=self.items[1]).exists())
+
+    @override_settings(IDEMPOTENCY_MAX_KEYS=2)
+    def test_table_is_bounded(self):
+        with mock.patch.object(idempotency, 'PRUNE_EVERY', 1):
+            for i in range(4):
+                Cart.objects.filter(menuitem=self.items[1]).delete()
+                self.add_to_cart(f'add-{i}')
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True).order_by('id')), ['add-2', 'add-3'])
+
+
+@override_settings(ROOT_URLCONF='LittleLemonAPI.async_urls')
+class AsyncReadViewTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.token = Token.objects.create(user=self.manager)
+        self.async_client = AsyncClient()
+        self.auth = {'Authorization': f'Token {self.token.key}'}
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        items = [self.make_menu_item(f'Dish {i}', price=f'{i % 3 + 1}.00') for i in range(6)]
+        customer = self.make_user('customer', self.customer_group)
+        self.make_order(customer, [(items[0], 1), (items[1], 2)])
+
+    async def assert_same_as_sync(self, url, params=None):
+        response = await self.async_client.get(url, params or {}, headers=self.auth)
+        # both views share the catalog cache
+        catalog_cache.clear()
+        expected = await sync_to_async(self.client.get)(url, params or {})
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+    async def test_menu_items(self):
+        await self.assert_same_as_sync('/menu-items', {'perpage': 4, 'page': 2, 'ordering': '-price'})
+        await self.assert_same_as_sync('/menu-items', {'perpage': 2, 'page': 1, 'search': 'dish 3'})
+        response = await self.assert_same_as_sync('/menu-items', {'pagination': 'cursor', 'perpage': 4, 'ordering': 'price'})
+        await self.assert_same_as_sync(response.json()['next'])
+
+    async def test_menu_items_without_perpage(self):
+        response = await self.assert_same_as_sync('/menu-items')
+        self.assertEqual(len(response.json()), 6)
+        await self.assert_same_as_sync('/menu-items', {'page': 2, 'ordering': 'title'})
+        await self.assert_same_as_sync('/menu-items', {'perpage': 2, 'page': 'x'})
+
+    async def test_head(self):
+        response = await self.async_client.head('/categories', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+
+    async def test_menu_item_detail(self):
+        item = await MenuItem.objects.afirst()
+        await self.assert_same_as_sync(f'/menu-items/{item.id}')
+        await self.assert_same_as_sync('/menu-items/999')
+
+    async def test_categories_and_orders(self):
+        await self.assert_same_as_sync('/categories')
+        response = await self.assert_same_as_sync('/orders')
+        self.assertEqual(len(response.json()['results'][0]['order_items']), 2)
+
+    async def test_authentication_and_permissions(self):
+        response = await AsyncClient().get('/orders')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        response = await AsyncClient().get('/orders', headers={'Authorization': 'Token nope'})
+        self.assertEqual(response.status_code, 401)
+        crew = await sync_to_async(self.make_user)('crew')
+        token = await Token.objects.acreate(user=crew)
+        response = await AsyncClient().get('/categories', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_writes_use_sync_views(self):
+        response = await self.async_client.post('/categories', {'slug': 'drinks', 'name': 'Drinks'}, headers=self.auth)
+        self.assertEqual(response.status_code, 201)
+
+
+class SalesRollupTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.customer = self.make_user('customer', self.customer_group)
+        self.soup = self.make_menu_item('Soup', price='4.00')
+        self.cake = self.make_menu_item('Cake', price='6.00')
+        self.today = timezone.now().date().isoformat()
+
+    def report(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/reports/sales', {'from': self.today, 'to': self.today})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def snapshot(self):
+        return (
+            list(DailySales.objects.values_list('date', 'revenue', 'order_count', 'item_count')),
+            sorted(DailyMenuItemSales.objects.values_list('date', 'menuitem_id', 'quantity', 'revenue')),
+        )
+
+    def test_checkout_and_delete_update_rollups(self):
+        Cart.objects.create(user=self.customer, menuitem=self.soup, quantity=2, unit_price=self.soup.price)
+        Cart.objects.create(user=self.customer, menuitem=self.cake, quantity=1, unit_price=self.cake.price)
+        self.client.force_authenticate(self.customer)
+        self.client.post('/api/orders')
+        self.make_order(self.customer, [(self.cake, 3)])
+
+        report = self.report()
+        self.assertEqual((report['revenue'], report['order_count'], report['item_count']), ('32.00', 2, 6))
+        self.assertEqual(report['menu_items'][0], {'menuitem_id': self.cake.id, 'title': 'Cake', 'quantity': 4, 'revenue': '24.00'})
+
+        self.client.delete(f'/api/orders/{Order.objects.first().id}')
+        report = self.report()
+        self.assertEqual((report['revenue'], report['order_count'], report['item_count']), ('18.00', 1, 3))
+        self.assertEqual(report['days'][0]['revenue'], '18.00')
+
+    def test_rebuild_matches_incremental(self):
+        self.make_order(self.customer, [(self.soup, 1), (self.cake, 2)])
+        self.make_order(self.customer, [(self.soup, 5)])
+        self.make_order(self.customer, [(self.cake, 1)]).delete()
+        incremental = self.snapshot()
+        call_command('rebuild_sales_rollups', stdout=mock.Mock())
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_report_reads_only_rollups(self):
+        self.make_order(self.customer, [(self.soup, 1)])
+        self.report()
+        self.client.force_authenticate(self.manager)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/reports/sales', {'from': self.today, 'to': self.today})
+        tables = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('"LittleLemonAPI_order"', tables)
+        self.assertNotIn('"LittleLemonAPI_orderitem"', tables)
+
+    def test_raw_field_values(self):
+        order = Order.objects.create(user=self.customer, total='12.00')
+        OrderItem.objects.create(order=order, menuitem=self.soup, quantity='3', unit_price='4.00', total='12.00')
+        self.assertEqual(self.snapshot()[0][0][1:], (Decimal('12.00'), 1, 3))
+
+    def test_rollups_follow_the_orders_database(self):
+        alias = 'rollup_other'
+        with tempfile.TemporaryDirectory() as workdir:
+            connections.settings[alias] = dict(connections.settings['default'], NAME=f'{workdir}/other.sqlite3')
+            try:
+                call_command('migrate', database=alias, verbosity=0)
+                user = User.objects.using(alias).create(username='other')
+                category = Category.objects.using(alias).create(slug='other', name='Other')
+                item = MenuItem.objects.using(alias).create(title='Other', price=Decimal('2.00'), category=category)
+                order = Order.objects.using(alias).create(user=user, total=Decimal('4.00'))
+                OrderItem.objects.using(alias).create(order=order, menuitem=item, quantity=2, unit_price=item.price, total=Decimal('4.00'))
+                self.assertEqual(list(DailySales.objects.using(alias).values_list('revenue', 'order_count', 'item_count')), [(Decimal('4.00'), 1, 2)])
+                self.assertFalse(DailySales.objects.exists())
+            finally:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+
+    def test_manager_only_and_validation(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/reports/sales', {'from': self.today, 'to': self.today}).status_code, 403)
+        self.client.force_authenticate(self.manager)
+        self.assertEqual(self.client.get('/api/reports/sales', {'from': self.today}).status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/sales', {'from': 'yesterday', 'to': self.today}).status_code, 400)
+
+
+class OrderArchiveTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.crew = self.make_user('crew', self.crew_group)
+        self.soup = self.make_menu_item('Soup', price='4.00')
+        self.cake = self.make_menu_item('Cake', price='6.00')
+        self.old = [self.make_order(self.customer, [(self.soup, 2), (self.cake, 1)], self.crew) for _ in range(3)]
+        self.open = self.make_order(self.customer, [(self.soup, 1)], self.crew)
+        self.recent = self.make_order(self.customer, [(self.cake, 1)], self.crew)
+        Order.objects.exclude(id=self.open.id).update(status=True)
+        Order.objects.exclude(id=self.recent.id).update(date=timezone.now().date() - timedelta(days=100))
+        self.client.force_authenticate(self.customer)
+
+    def archive(self, **options):
+        call_command('archive_orders', stdout=mock.MagicMock(), **options)
+
+    def test_moves_old_delivered_orders(self):
+        sales = list(DailySales.objects.values_list('date', 'revenue', 'order_count', 'item_count'))
+        self.archive(batch_size=2)
+        self.assertEqual(set(ArchivedOrder.objects.values_list('id', flat=True)), {order.id for order in self.old})
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.open.id, self.recent.id})
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[order.id for order in self.old]).exists())
+        self.assertEqual(ArchivedOrder.objects.get(id=self.old[0].id).items[0][1:], [self.soup.id, 2, '4.00', '8.00'])
+        # still sales
+        self.assertEqual(list(DailySales.objects.values_list('date', 'revenue', 'order_count', 'item_count')), sales)
+
+    def test_rebuild_counts_archived_orders(self):
+        # setUp moved the orders' dates behind the rollups' back
+        call_command('rebuild_sales_rollups', stdout=mock.MagicMock())
+        self.archive()
+        Order.objects.all().delete()
+        self.soup.delete()
+        # removing orders leaves zeroed rows that a rebuild does not recreate
+        sales = (
+            list(DailySales.objects.exclude(order_count=0).values_list('date', 'revenue', 'order_count', 'item_count').order_by('date')),
+            sorted(DailyMenuItemSales.objects.exclude(quantity=0).values_list('date', 'title', 'quantity', 'revenue')),
+        )
+        # the deleted soup's history is kept under its title
+        self.assertIn('Soup', [row[1] for row in sales[1]])
+        call_command('rebuild_sales_rollups', stdout=mock.MagicMock())
+        self.assertEqual((
+            list(DailySales.objects.exclude(order_count=0).values_list('date', 'revenue', 'order_count', 'item_count').order_by('date')),
+            sorted(DailyMenuItemSales.objects.exclude(quantity=0).values_list('date', 'title', 'quantity', 'revenue')),
+        ), sales)
+
+    def test_detail_falls_back_to_archive(self):
+        url = f'/api/orders/{self.old[0].id}'
+        live = json.loads(self.client.get(url).content)
+        self.archive()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), live)
+
+        self.client.force_authenticate(self.make_user('other', self.customer_group))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get('/api/orders/999').status_code, 404)
+
+    def test_deleted_menu_item(self):
+        self.archive()
+        Order.objects.all().delete()
+        self.soup.delete()
+        items = self.client.get(f'/api/orders/{self.old[0].id}').data['order_items']
+        self.assertEqual([item['menuitem'] and item['menuitem']['title'] for item in items], [None, 'Cake'])
+
+    def test_resumes_after_interruption(self):
+        create = ArchivedOrder.objects.bulk_create
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('interrupted')
+            return create(*args, **kwargs)
+        with mock.patch.object(ArchivedOrder.objects, 'bulk_create', fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.archive(batch_size=1)
+        # the failed batch left its order live
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+        self.assertEqual(Order.objects.count(), 4)
+        self.archive(batch_size=1)
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class OrderExportTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user('manager', self.manager_group))
+        customer = self.make_user('customer', self.customer_group)
+        soup = self.make_menu_item('Soup', price='4.00')
+        cake = self.make_menu_item('Cake', price='6.00')
+        self.first = self.make_order(customer, [(soup, 2), (cake, 1)])
+        self.second = self.make_order(customer, [(cake, 1)])
+        Order.objects.filter(id=self.second.id).update(status=True)
+
+    def export(self, **params):
+        response = self.client.get('/api/orders/export', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        lines = self.export(type='csv').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['order_id', 'date', 'user'])
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith(f'{self.first.id},'))
+        self.assertTrue(lines[1].endswith(',Soup,2,4.00,8.00'))
+
+    def test_ndjson_nests_items(self):
+        orders = [json.loads(line) for line in self.export(type='ndjson').splitlines()]
+        self.assertEqual([order['id'] for order in orders], [self.first.id, self.second.id])
+        self.assertEqual([item['menuitem'] for item in orders[0]['order_items']], ['Soup', 'Cake'])
+        self.assertEqual(orders[0]['total'], '14.00')
+
+    def test_filters(self):
+        self.assertEqual(len(self.export(type='csv', status='1').splitlines()), 2)
+        self.assertEqual(len(self.export(type='csv', to='2000-01-01').splitlines()), 1)
+        self.assertEqual(self.client.get('/api/orders/export', {'from': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export', {'type': 'xlsx'}).status_code, 400)
+
+    async def test_async_stream_under_asgi(self):
+        expected = await sync_to_async(self.export)(type='ndjson')
+        token = await Token.objects.acreate(user=await User.objects.aget(username='manager'))
+        response = await AsyncClient().get('/api/orders/export', {'type': 'ndjson'}, headers={'Authorization': f'Token {token.key}'})
+        # an async iterator, so Django does not collect the export into a list
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]).decode(), expected)
+
+    def test_single_streaming_query(self):
+        response = self.client.get('/api/orders/export', {'type': 'csv'})
+        with CaptureQueriesContext(connection) as ctx:
+            b''.join(response.streaming_content)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+
+class FastRowsTest(LittleLemonTestCase):
+    # list endpoints build rows without serializers; the bytes must not change
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.customer = self.make_user('customer', self.customer_group)
+        self.crew = self.make_user('crew', self.crew_group)
+        desserts = Category.objects.create(slug='desserts', name='Desserts')
+        self.items = [
+            self.make_menu_item('Crème brûlée', '7.50', desserts),
+            self.make_menu_item('Greek Salad', '12.00'),
+            self.make_menu_item('Line\u2028Break', '0.99'),
+        ]
+        MenuItem.objects.filter(title='Greek Salad').update(featured=True)
+        self.make_order(self.customer, [(self.items[0], 2), (self.items[1], 1)], delivery_crew=self.crew)
+        self.make_order(self.customer, [(self.items[2], 3)])
+        for item in self.items[:2]:
+            Cart.objects.create(user=self.customer, menuitem=item, quantity=2, unit_price=item.price)
+
+    def render(self, serializer_class, instance):
+        return JSONRenderer().render(serializer_class(instance, many=True).data)
+
+    def test_menu_items(self):
+        self.client.force_authenticate(self.customer)
+        expected = self.render(MenuItemSerializer, MenuItem.objects.select_related('category').order_by('price'))
+        response = self.client.get('/api/menu-items', {'ordering': 'price', 'page': 1, 'perpage': 10})
+        self.assertEqual(response.content, expected)
+        # served again from the catalog cache, already encoded
+        self.assertEqual(self.client.get('/api/menu-items', {'ordering': 'price', 'page': 1, 'perpage': 10}).content, expected)
+        response = self.client.get('/api/menu-items', {'pagination': 'cursor', 'ordering': 'price'})
+        self.assertEqual(response.json()['results'], json.loads(expected))
+
+    def test_indented_json_still_honoured(self):
+        self.client.force_authenticate(self.customer)
+        self.client.get('/api/menu-items', {'page': 1, 'perpage': 10})
+        response = self.client.get('/api/menu-items', {'page': 1, 'perpage': 10}, HTTP_ACCEPT='application/json; indent=2')
+        self.assertTrue(response.content.startswith(b'[\n  {'))
+
+    def test_categories(self):
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/categories')
+        self.assertEqual(response.content, self.render(CategorySerializer, Category.objects.all()))
+
+    def test_cart(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get('/api/cart/menu-items')
+        self.assertEqual(response.content, self.render(CartSerializer, Cart.objects.filter(user=self.customer)))
+
+    def test_orders(self):
+        for user in (self.customer, self.manager, self.crew):
+            self.client.force_authenticate(user)
+            orders = Order.objects.filter(user=self.customer).order_by('-date', '-id')
+            if user == self.crew:
+                orders = orders.filter(delivery_crew=self.crew)
+            response = self.client.get('/api/orders')
+            expected = JSONRenderer().render({
+                'count': len(orders),
+                'next': None,
+                'previous': None,
+                'results': OrderListSerializer(orders, many=True).data,
+            })
+            self.assertEqual(response.content, expected)
+
+
+class BenchmarkCommandTest(LittleLemonTestCase):
+    def test_reports_every_route(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'benchmark', categories=2, menu_items=10, customers=3, delivery_crew=2, orders=10,
+                requests=2, mix=10, output=output.name, stdout=mock.MagicMock(),
+            )
+            results = json.load(open(output.name))
+        routes = {name.split(' ')[1] for name in results['endpoints']}
+        self.assertEqual(routes, {str(pattern.pattern).replace('<str:group_name>/', '').replace('<int:pk>', '<pk>') for pattern in urlpatterns})
+        for name, result in results['endpoints'].items():
+            self.assertEqual(result['requests'], 2)
+            if name.startswith('GET'):
+                self.assertEqual(result['errors'], 0, name)
+        # seeded rows are rolled back
+        self.assertFalse(User.objects.filter(username__startswith='bench-').exists())
+
+
+class MeasureStartupTest(LittleLemonTestCase):
+    def test_compares_profiles(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('measure_startup', runs=1, output=output.name, stdout=mock.MagicMock())
+            results = json.load(open(output.name))
+        full, lean = results['LittleLemon.settings'], results['LittleLemon.settings_api']
+        # both boot and answer an unauthenticated API request
+        self.assertEqual(full['status'], '401 Unauthorized')
+        self.assertEqual(lean['status'], '401 Unauthorized')
+        self.assertLess(lean['modules'], full['modules'])
+
+
+@override_settings(REQUEST_METRICS=True, SLOW_REQUEST_MS=0)
+class RequestMetricsTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        item = self.make_menu_item('Bruschetta')
+        self.order = self.make_order(self.customer, [(item, 1), (self.make_menu_item('Greek Salad'), 2)])
+        self.client.force_authenticate(self.customer)
+
+    def test_server_timing_header(self):
+        with self.assertLogs('LittleLemonAPI.requests', 'WARNING'):
+            response = self.client.get('/api/orders')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^sql;dur=[\d.]+;desc="\d+ queries, 0 duplicates"')
+        for name in ('serialize', 'render', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+
+    def test_slow_request_log_flags_repeated_queries(self):
+        with self.assertLogs('LittleLemonAPI.requests', 'WARNING') as logs:
+            self.client.get(f'/api/orders/{self.order.id}')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['event'], 'slow_request')
+        self.assertEqual(line['path'], f'/api/orders/{self.order.id}')
+        self.assertEqual(line['status'], 200)
+        # OrderItemSerializer loads each item's menu item one by one
+        self.assertGreater(line['duplicates'], 0)
+        self.assertGreaterEqual(line['most_repeated']['count'], 2)
+
+    @override_settings(REQUEST_METRICS=False)
+    def test_off_by_default(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertNotIn('Server-Timing', client.get('/api/orders'))
+
+
+class QueryBudgetTest(LittleLemonTestCase):
+    budgets = {
+        '/api/categories': 1,
+        # the catalog listings also read the shared catalog version
+        '/api/menu-items?page=1&perpage=10': 3,
+        '/api/menu-items?pagination=cursor': 2,
+        '/api/cart/menu-items': 3,
+        '/api/orders': 5,
+    }
+
+    def setUp(self):
+        super().setUp()
+        # a manager who also orders, so one user can reach every listing
+        self.user = self.make_user('owner', self.manager_group)
+        self.user.groups.add(self.customer_group)
+        items = [self.make_menu_item(f'Dish {i}') for i in range(5)]
+        for i in range(3):
+            self.make_order(self.user, [(item, 1) for item in items])
+            Cart.objects.create(user=self.user, menuitem=items[i], quantity=1, unit_price=items[i].price)
+
+    def test_list_endpoints_stay_within_budget(self):
+        self.client.force_authenticate(self.user)
+        for path, budget in self.budgets.items():
+            self.client.get(path)
+            catalog_cache.clear()
+            with self.subTest(path=path), self.assertQueryBudget(budget):
+                self.assertEqual(self.client.get(path).status_code, 200)
+
+
+class ImportMenuTest(LittleLemonTestCase):
+    def run_import(self, suffix, content, **options):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            out = mock.MagicMock()
+            call_command('import_menu', f.name, stdout=out, stderr=mock.MagicMock(), **options)
+        return out.write.call_args[0][0]
+
+    def test_csv_inserts_then_updates(self):
+        self.make_menu_item('Bruschetta', '5.00')
+        summary = self.run_import('.csv', (
+            'title,price,featured,category,category_name\n'
+            'Bruschetta,5.00,false,mains,\n'
+            'Greek Salad,12.50,true,starters,Starters\n'
+            'Tiramisu,6.00,no,desserts,\n'
+            'Broken,abc,no,mains,\n'
+        ), batch_size=2)
+        self.assertIn('Menu items: 2 inserted', summary)
+        self.assertIn('0 updated, 1 unchanged, 1 skipped', summary)
+        self.assertIn('Categories: 2 inserted, 0 updated', summary)
+        salad = MenuItem.objects.select_related('category').get(title='Greek Salad')
+        self.assertEqual((salad.price, salad.featured, salad.category.name), (Decimal('12.50'), True, 'Starters'))
+        self.assertEqual(Category.objects.get(slug='desserts').name, 'desserts')
+
+        summary = self.run_import('.csv', 'title,price,featured,category\nGreek Salad,13.00,true,mains\n')
+        self.assertIn('0 inserted, 1 updated, 0 unchanged', summary)
+        salad.refresh_from_db()
+        self.assertEqual((salad.price, salad.category_id), (Decimal('13.00'), self.category.id))
+
+    def test_malformed_rows_are_skipped(self):
+        rows = [
+            {'title': 'Soup', 'price': 'NaN', 'category': 'mains'},
+            {'title': 'Pie', 'price': 'Infinity', 'category': 'mains'},
+            1,
+            'x',
+            {'title': 'Tea', 'price': '2.00', 'category': 'drinks', 'category_name': 7},
+            {'title': 'Cake', 'price': '6.00', 'category': 'desserts'},
+        ]
+        summary = self.run_import('.json', json.dumps(rows))
+        self.assertIn('1 inserted, 0 updated, 0 unchanged, 5 skipped', summary)
+        self.assertEqual(list(MenuItem.objects.values_list('title', flat=True)), ['Cake'])
+
+    def test_json_array_and_lines(self):
+        rows = [{'title': f'Dish {i}', 'price': i + 0.5, 'featured': i % 2 == 0, 'category': 'mains'} for i in range(50)]
+        summary = self.run_import('.json', json.dumps(rows, indent=1))
+        self.assertIn('50 inserted', summary)
+        summary = self.run_import('.jsonl', '\n'.join(json.dumps(row) for row in rows[:10]))
+        self.assertIn('0 inserted, 0 updated, 10 unchanged', summary)
+        self.assertEqual(MenuItem.objects.get(title='Dish 3').price, Decimal('3.50'))
+
+    def test_bumps_catalog_version(self):
+        self.client.force_authenticate(self.make_user('customer', self.customer_group))
+        self.assertEqual(self.client.get('/api/menu-items', {'page': 1, 'perpage': 10}).json(), [])
+        self.run_import('.csv', 'title,price,category\nBruschetta,5.00,mains\n')
+        self.assertEqual([item['title'] for item in self.client.get('/api/menu-items', {'page': 1, 'perpage': 10}).json()], ['Bruschetta'])
+
+
+class QueryPlanTest(LittleLemonTestCase):
+    """
+    EXPLAIN QUERY PLAN for the hot queries: none may scan a whole table, and
+    order listings must come out of an index already sorted.
+    """
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.crew = self.make_user('crew', self.crew_group)
+        self.manager = self.make_user('manager', self.manager_group)
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def assertIndexed(self, queryset, index=None, sorted_by_index=False):
+        plan = self.plan(queryset)
+        scans = [step for step in plan if re.fullmatch(r'SCAN \S+', step)]
+        self.assertEqual(scans, [], plan)
+        if index:
+            self.assertTrue(any(index in step for step in plan), plan)
+        if sorted_by_index:
+            self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_order_listings(self):
+        self.assertIndexed(visible_orders(self.customer, {CUSTOMER})[:20], 'order_user_date_idx', sorted_by_index=True)
+        self.assertIndexed(visible_orders(self.crew, {DELIVERY_CREW})[:20], 'order_crew_date_idx', sorted_by_index=True)
+        self.assertIndexed(visible_orders(self.manager, {MANAGER})[:20], sorted_by_index=True)
+        self.assertIndexed(Order.objects.filter(delivery_crew=self.crew, status=False).order_by('-date'), 'order_crew_date_idx', sorted_by_index=True)
+        # unassigned, undelivered orders, oldest first
+        self.assertIndexed(Order.objects.filter(delivery_crew__isnull=True, status=False).order_by('date'), 'order_crew_date_idx', sorted_by_index=True)
+
+    def test_order_lines(self):
+        self.assertIndexed(OrderItem.objects.filter(order__in=[1, 2, 3]).select_related('menuitem__category'))
+
+    def test_menu_by_category_and_price(self):
+        queryset = filter_menu_items({'category': self.category.id, 'price_from': '2', 'price_to': '9'})
+        self.assertIndexed(queryset, 'menuitem_category_price_idx')
+        self.assertIndexed(queryset.order_by('price'), 'menuitem_category_price_idx', sorted_by_index=True)
+
+    def test_menu_cursor_page(self):
+        queryset = MenuItem.objects.filter(price__gt=5).order_by('price', 'id')[:21]
+        self.assertIndexed(queryset, sorted_by_index=True)
+
+    def test_cart_by_user(self):
+        self.assertIndexed(Cart.objects.filter(user=self.customer).select_related('menuitem__category'))
+
+    def test_sales_report_range(self):
+        today = timezone.now().date()
+        self.assertIndexed(DailySales.objects.filter(date__range=(today, today)).order_by('date'), sorted_by_index=True)
+        self.assertIndexed(DailyMenuItemSales.objects.filter(date__range=(today, today)))
+
+
+class DispatchTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = self.make_user('manager', self.manager_group)
+        self.customer = self.make_user('customer', self.customer_group)
+        self.crew = [self.make_user(f'crew{i}', self.crew_group) for i in range(2)]
+        self.item = self.make_menu_item('Bruschetta')
+        self.client.force_authenticate(self.manager)
+
+    def queue(self, count):
+        return [self.make_order(self.customer, [(self.item, 1)]) for _ in range(count)]
+
+    # LittleLemon.settings_api serves JSON only
+    @skipUnless('rest_framework.renderers.BrowsableAPIRenderer' in settings.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'], 'no browsable API')
+    def test_browsable_api(self):
+        self.queue(1)
+        response = self.client.get('/api/orders/dispatch', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('name="limit"', response.content.decode())
+
+    def test_queue_is_unassigned_undelivered_oldest_first(self):
+        queued = self.queue(3)
+        self.make_order(self.customer, [(self.item, 1)], delivery_crew=self.crew[0])
+        Order.objects.filter(id=queued[1].id).update(status=True)
+        response = self.client.get('/api/orders/dispatch')
+        self.assertEqual([order['id'] for order in response.json()['results']], [queued[0].id, queued[2].id])
+
+    def test_balances_on_open_orders(self):
+        for _ in range(2):
+            self.make_order(self.customer, [(self.item, 1)], delivery_crew=self.crew[0])
+        delivered = self.make_order(self.customer, [(self.item, 1)], delivery_crew=self.crew[1])
+        Order.objects.filter(id=delivered.id).update(status=True)
+        queued = self.queue(4)
+        response = self.client.post('/api/orders/dispatch', {'limit': 10}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assigned'], 4)
+        self.assertEqual(response.data['queued'], 0)
+        for crew in self.crew:
+            self.assertEqual(Order.objects.filter(delivery_crew=crew, status=False).count(), 3)
+        # the oldest order goes first, to the idle crew member
+        self.assertEqual(Order.objects.get(id=queued[0].id).delivery_crew, self.crew[1])
+
+    def test_set_based_updates(self):
+        # warm the role cache
+        self.client.get('/api/orders/dispatch')
+
+        def count_queries(orders):
+            self.queue(orders)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/orders/dispatch', {'limit': 1000}, format='json')
+            self.assertEqual(response.data['assigned'], orders)
+            return len(ctx.captured_queries)
+        self.assertEqual(count_queries(4), count_queries(200))
+
+    def test_limit_and_crew_subset(self):
+        self.queue(5)
+        response = self.client.post('/api/orders/dispatch', {'limit': 2, 'crew': ['crew1']}, format='json')
+        self.assertEqual(response.data['assignments'], [{'delivery_crew': 'crew1', 'orders': response.data['assignments'][0]['orders']}])
+        self.assertEqual(response.data['assigned'], 2)
+        self.assertEqual(response.data['queued'], 3)
+        response = self.client.post('/api/orders/dispatch', {'crew': ['crew1', 'customer']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['usernames'], ['customer'])
+
+    def test_put_assigns_a_delivery_crew(self):
+        order = self.queue(1)[0]
+        response = self.client.put(f'/api/orders/{order.id}', {'delivery_crew': 'crew0', 'status': 0}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(id=order.id).delivery_crew, self.crew[0])
+
+
+@override_settings(ROOT_URLCONF='LittleLemonAPI.asgi_urls')
+class OrderEventsTest(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('customer', self.customer_group)
+        self.crew = self.make_user('crew', self.crew_group)
+        self.order = self.make_order(self.customer, [(self.make_menu_item('Bruschetta'), 1)])
+        self.auth = {'Authorization': f'Token {Token.objects.create(user=self.customer).key}'}
+        self.client.force_authenticate(self.make_user('manager', self.manager_group))
+
+    def put(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(f'/orders/{self.order.id}', data, format='json')
+
+    async def test_pushes_changes_until_delivered(self):
+        response = await AsyncClient().get(f'/orders/{self.order.id}/events', headers=self.auth)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        first = (await anext(events)).decode()
+        self.assertIn('"status": false, "delivery_crew": null', first)
+
+        await sync_to_async(self.put)(delivery_crew='crew', status=0)
+        second = (await asyncio.wait_for(anext(events), 5)).decode()
+        self.assertIn(f'"delivery_crew": {self.crew.id}', second)
+        await sync_to_async(self.put)(delivery_crew='crew', status=1)
+        third = (await asyncio.wait_for(anext(events), 5)).decode()
+        self.assertIn('"status": true', third)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(events), 5)
+
+    async def test_ends_when_the_order_is_deleted(self):
+        response = await AsyncClient().get(f'/orders/{self.order.id}/events', headers=self.auth)
+        events = aiter(response.streaming_content)
+        await anext(events)
+
+        def delete():
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.delete(f'/orders/{self.order.id}')
+        self.assertEqual((await sync_to_async(delete)()).status_code, 200)
+        last = (await asyncio.wait_for(anext(events), 5)).decode()
+        self.assertIn('event: deleted', last)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(events), 5)
+
+    @override_settings(ORDER_EVENTS_MAX_AGE=0.1)
+    async def test_stream_lifetime_is_capped(self):
+        response = await AsyncClient().get(f'/orders/{self.order.id}/events', headers=self.auth)
+        events = aiter(response.streaming_content)
+        await anext(events)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(events), 5)
+
+    async def test_stops_on_client_disconnect(self):
+        token = await Token.objects.aget(user=self.customer)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': f'/orders/{self.order.id}/events', 'raw_path': b'', 'query_string': b'', 'root_path': '',
+            'headers': [(b'authorization', f'Token {token.key}'.encode())], 'server': ('testserver', 80),
+        }
+        messages = asyncio.Queue()
+        await messages.put({'type': 'http.request', 'body': b''})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'http.response.body' and message.get('body'):
+                await messages.put({'type': 'http.disconnect'})
+
+        # as AsyncClient does, keep the test transaction's connection open
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            await asyncio.wait_for(DisconnectWatcher(ASGIHandler())(scope, messages.get, send), 5)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'event: order', sent[1]['body'])
+        self.assertEqual(order_notifier.waiters, {})
+
+    async def test_only_the_orders_people(self):
+        other = await sync_to_async(self.make_user)('other', self.customer_group)
+        token = await Token.objects.acreate(user=other)
+        response = await AsyncClient().get(f'/orders/{self.order.id}/events', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 403)
+        response = await AsyncClient().get('/orders/999/events', headers=self.auth)
+        self.assertEqual(response.status_code, 404)
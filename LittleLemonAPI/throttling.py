@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+from django.conf import settings
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+# Buckets idle for this long are full again, the same as having no row at all
+PRUNE_AFTER = 86400
+PRUNE_EVERY = 1000
+
+
+class ThrottleStore:
+    """
+    Token buckets in a small SQLite file shared by every worker process on the
+    host. Each key is one row (tokens left, last refill time) updated by a
+    single atomic upsert, so checks cost one statement and constant space.
+    """
+    schema = '''
+        CREATE TABLE IF NOT EXISTS throttle_bucket (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            allowed INTEGER NOT NULL DEFAULT 1
+        ) WITHOUT ROWID
+    '''
+    take_sql = '''
+        INSERT INTO throttle_bucket (key, tokens, updated) VALUES (:key, :capacity - 1, :now)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE
+                WHEN min(:capacity, tokens + (:now - updated) * :rate) >= 1
+                THEN min(:capacity, tokens + (:now - updated) * :rate) - 1
+                ELSE min(:capacity, tokens + (:now - updated) * :rate)
+            END,
+            allowed = min(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            updated = :now
+        RETURNING tokens, allowed
+    '''
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+        self.calls = 0
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # losing a few buckets on power failure is fine for rate limiting
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(self.schema)
+            self.local.conn = conn
+        return conn
+
+    def take(self, key, capacity, duration, now):
+        """
+        Take a token from key's bucket. Returns (allowed, tokens left).
+        """
+        conn = self.connection()
+        tokens, allowed = conn.execute(self.take_sql, {
+            'key': key, 'capacity': capacity, 'rate': capacity / duration, 'now': now,
+        }).fetchone()
+        self.calls += 1
+        if self.calls % PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM throttle_bucket WHERE updated < ?', (now - PRUNE_AFTER,))
+        return bool(allowed), tokens
+
+    def reset(self):
+        self.connection().execute('DELETE FROM throttle_bucket')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_throttle_store():
+    path = getattr(settings, 'THROTTLE_DB_PATH', settings.BASE_DIR / 'throttle.sqlite3')
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ThrottleStore(path)
+    return store
+
+
+class TokenBucketThrottleMixin:
+    """
+    Replaces SimpleRateThrottle's cached timestamp history with a shared token
+    bucket: the rate 'N/period' allows bursts of N refilled at N per period.
+    """
+    def get_rate(self):
+        # read rates at call time so settings overrides apply
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        allowed, self.tokens = get_throttle_store().take(self.key, self.num_requests, self.duration, self.now)
+        return allowed
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class AnonRateThrottle(TokenBucketThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(TokenBucketThrottleMixin, throttling.UserRateThrottle):
+    pass
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import UserRoleView, UserRoleDetailView,CategoryView, MenuItemView, MenuItemDetailView, CartView, OrderView, OrderDetailView
+from .views import UserRoleView, UserRoleDetailView,CategoryView, MenuItemView, MenuItemDetailView, MenuItemBulkView, CartView, CartBatchView, CartSummaryView, OrderView, OrderDetailView, OrderExportView, SalesReportView, DispatchView
 
 urlpatterns = [
     path('groups/<str:group_name>/users', UserRoleView.as_view()),
@@ -7,8 +7,14 @@ urlpatterns = [
     path('categories', CategoryView.as_view()),
     path('menu-items', MenuItemView.as_view()),
     path('menu-items/<int:pk>', MenuItemDetailView.as_view()),
+    path('menu-items/bulk', MenuItemBulkView.as_view()),
     path('cart/menu-items', CartView.as_view()),
+    path('cart/menu-items/batch', CartBatchView.as_view()),
+    path('cart/summary', CartSummaryView.as_view()),
     path('orders', OrderView.as_view()),
     path('orders/<int:pk>', OrderDetailView.as_view()),
+    path('orders/export', OrderExportView.as_view()),
+    path('orders/dispatch', DispatchView.as_view()),
+    path('reports/sales', SalesReportView.as_view()),
 
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.shortcuts import render
+from decimal import Decimal, ROUND_HALF_UP
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, DestroyAPIView
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
@@ -6,12 +7,28 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User, Group
 from .permissions import IsManager, IsCustomer, IsDeliveryCrew
-from .serializers import CategorySerializer, MenuItemSerializer, UserSerializer, CartSerializer, OrderSerializer, OrderItemSerializer
-from .models import Category, MenuItem, Cart, Order, OrderItem
+from .roles import get_request_roles, MANAGER, CUSTOMER, DELIVERY_CREW
+from .serializers import CategorySerializer, MenuItemSerializer, UserSerializer, OrderSerializer, OrderItemSerializer, CartBatchSerializer, DispatchSerializer, MenuItemBulkSerializer
+from .models import Category, MenuItem, Cart, Order, OrderItem, DailySales, DailyMenuItemSales
+from django.utils.dateparse import parse_date
+from .cache import CatalogCacheMixin, bump_catalog_version
+from .exports import stream_csv, stream_ndjson, astream
+from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from . import carts, rollups
+from .dispatch import dispatch_queue, assign_orders
+from .archive import archived_order_detail
+from .routers import ReplicaReadMixin
+from .pagination import OrderPagination, MenuItemCursorPagination, menu_item_paginator, menu_item_page
+from django.db import transaction
+from django.db.models import Prefetch, Q, F, Sum, ExpressionWrapper, DecimalField
 from django.db.utils import IntegrityError
-from rest_framework.filters import SearchFilter
-from django.core.paginator import Paginator, EmptyPage
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from .filters import MenuItemSearchFilter
+from .instrumentation import timed
+from .idempotency import idempotent
+from .management.commands.import_menu import MAX_PRICE
+from .rows import category_rows, menu_item_rows, menu_item_row, cart_rows, cart_lines, user_rows, order_rows, decimal, ORDER_FIELDS
+from .throttling import UserRateThrottle, AnonRateThrottle
 
 # Create your views here.
 
@@ -55,16 +72,35 @@ class UserRoleDetailView(DestroyAPIView):
             return Response({'error': 'Group not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response(status=status.HTTP_200_OK)
 
-class CategoryView(ListCreateAPIView):
+class CategoryView(ReplicaReadMixin, ListCreateAPIView):
     throttle_classes = [AnonRateThrottle, UserRateThrottle]
     permission_classes = [IsAuthenticated, IsManager]
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
 
-class MenuItemView(ListCreateAPIView):
+    def list(self, request, *args, **kwargs):
+        with timed('serialize'):
+            data = category_rows(self.filter_queryset(self.get_queryset()))
+        return Response(data)
+
+def filter_menu_items(query_params):
+    # category and price filters shared by the sync and async menu views
+    category = query_params.get('category', None)
+    price_from = query_params.get('price_from', None)
+    price_to = query_params.get('price_to', None)
+    queryset = MenuItem.objects.select_related('category')
+    if category:
+        queryset = queryset.filter(category__id=category)
+    if price_from:
+        queryset = queryset.filter(price__gte=price_from)
+    if price_to:
+        queryset = queryset.filter(price__lte=price_to)
+    return queryset
+
+class MenuItemView(ReplicaReadMixin, CatalogCacheMixin, ListCreateAPIView):
     serializer_class = MenuItemSerializer
     queryset = MenuItem.objects.all()
-    filter_backends = [SearchFilter]
+    filter_backends = [MenuItemSearchFilter]
     search_fields = ['title', 'category__name']
     throttle_classes = [AnonRateThrottle, UserRateThrottle]
 
@@ -75,33 +111,54 @@ class MenuItemView(ListCreateAPIView):
             self.permission_classes = [IsAuthenticated, IsManager]
         return super().get_permissions()
 
+    def uses_cursor(self):
+        return self.request.query_params.get('pagination') == 'cursor'
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor switches to keyset pages; the default stays page/perpage
+        if not hasattr(self, '_paginator'):
+            self._paginator = MenuItemCursorPagination() if self.uses_cursor() else None
+        return self._paginator
+
     def get_queryset(self):
-        category = self.request.query_params.get('category', None)
-        price_from = self.request.query_params.get('price_from', None)
-        price_to = self.request.query_params.get('price_to', None)
         ordering = self.request.query_params.get('ordering', None)
-        perpage = self.request.query_params.get('perpage', None)
-        page = self.request.query_params.get('page', None)
-        queryset = MenuItem.objects.all()
-        if category:
-            queryset = queryset.filter(category__id=category)
-        if price_from:
-            queryset = queryset.filter(price__gte=price_from)
-        if price_to:
-            queryset = queryset.filter(price__lte=price_to)
+        queryset = filter_menu_items(self.request.query_params)
+        if self.uses_cursor():
+            # the cursor paginator applies its own keyset ordering
+            return queryset
         if ordering:
             ordering_fieds = ordering.split(',')
             queryset = queryset.order_by(*ordering_fieds)
-        paginator = Paginator(queryset, perpage)
-        try:
-            queryset = paginator.page(number=page)
-        except EmptyPage:
-            queryset = paginator.page(number=paginator.num_pages)
         return queryset
 
-class MenuItemDetailView(RetrieveUpdateDestroyAPIView):
+    def filter_queryset(self, queryset):
+        # search before slicing out the page/perpage page
+        queryset = super().filter_queryset(queryset)
+        if self.uses_cursor():
+            return queryset
+        perpage = self.request.query_params.get('perpage', None)
+        page = self.request.query_params.get('page', None)
+        return menu_item_page(menu_item_paginator(queryset, perpage), page)
+
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(request, self.list_rows)
+
+    def list_rows(self):
+        # rows instead of MenuItemSerializer, see rows.py
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.uses_cursor():
+            items = self.paginate_queryset(queryset)
+            with timed('serialize'):
+                data = [menu_item_row(item) for item in items]
+            return self.get_paginated_response(data)
+        with timed('serialize'):
+            data = menu_item_rows(queryset.object_list)
+        return Response(data)
+
+class MenuItemDetailView(ReplicaReadMixin, CatalogCacheMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = MenuItemSerializer
-    queryset = MenuItem.objects.all()
+    queryset = MenuItem.objects.select_related('category')
     throttle_classes = [AnonRateThrottle, UserRateThrottle]
 
     def get_permissions(self):
@@ -111,16 +168,90 @@ class MenuItemDetailView(RetrieveUpdateDestroyAPIView):
             self.permission_classes = [IsAuthenticated, IsManager]
         return super().get_permissions()
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.catalog_response(request, lambda: super(MenuItemDetailView, self).retrieve(request, *args, **kwargs))
+
+class MenuItemBulkView(APIView):
+    """
+    Reprice and (un)feature many menu items at once: absolute prices and
+    featured flags per item, and percentage changes per category. Everything
+    is applied in one transaction with bulk_update, and the outcome of every
+    item touched is reported.
+    """
+    permission_classes = [IsAuthenticated, IsManager]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    # MenuItem.price has 6 digits, 2 of them decimals
+    max_price = MAX_PRICE
+
+    def post(self, request):
+        serializer = MenuItemBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # the last entry wins if an item or category is listed twice
+        changes = {item['id']: item for item in serializer.validated_data.get('items', [])}
+        percents = {category['category_id']: category['percent'] for category in serializer.validated_data.get('categories', [])}
+
+        outcomes = {}
+        # statuses of the items repriced through each category
+        per_category = {category_id: [] for category_id in percents}
+        with transaction.atomic():
+            items = MenuItem.objects.select_for_update().filter(Q(id__in=changes) | Q(category_id__in=percents)).only('id', 'price', 'featured', 'category_id')
+            updated = []
+            for item in items:
+                price, featured = item.price, item.featured
+                if item.category_id in percents:
+                    price = (price * (100 + percents[item.category_id]) / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                change = changes.get(item.id, {})
+                price = change.get('price', price)
+                featured = change.get('featured', featured)
+                outcome = {'id': item.id, 'status': 'updated', 'price': decimal(price), 'featured': featured}
+                if price >= self.max_price:
+                    outcome.update(status='invalid', error=f'Price must be less than {self.max_price}', price=decimal(item.price), featured=item.featured)
+                elif (price, featured) == (item.price, item.featured):
+                    outcome['status'] = 'unchanged'
+                else:
+                    item.price, item.featured = price, featured
+                    updated.append(item)
+                outcomes[item.id] = outcome
+                if item.category_id in percents:
+                    per_category[item.category_id].append(outcome['status'])
+            MenuItem.objects.bulk_update(updated, ['price', 'featured'], batch_size=500)
+            found = set(Category.objects.filter(id__in=percents).values_list('id', flat=True)) if percents else set()
+            if updated:
+                # bulk_update sends no post_save, so the catalog cache is dropped once here
+                transaction.on_commit(bump_catalog_version)
+
+        for item_id in changes:
+            outcomes.setdefault(item_id, {'id': item_id, 'status': 'not_found'})
+        # the listed items in request order, then the rest of the repriced categories
+        ordered = [outcomes.pop(item_id) for item_id in changes] + [outcomes[item_id] for item_id in sorted(outcomes)]
+        statuses = [outcome['status'] for outcome in ordered]
+        return Response({
+            **{name: statuses.count(name) for name in ['updated', 'unchanged', 'invalid', 'not_found']},
+            'items': ordered,
+            'categories': [
+                {'category_id': category_id, 'status': self.category_status(category_id in found, per_category[category_id]), 'items': len(per_category[category_id])}
+                for category_id in percents
+            ],
+        }, status=status.HTTP_200_OK)
+
+    def category_status(self, found, statuses):
+        # updated once any of its items is; invalid when the rest were rejected
+        if not found:
+            return 'not_found'
+        if 'updated' in statuses:
+            return 'updated'
+        return 'invalid' if 'invalid' in statuses else 'unchanged'
+
 class CartView(APIView):
     permission_classes = [IsAuthenticated, IsCustomer]
     throttle_classes = [AnonRateThrottle, UserRateThrottle]
 
     def get(self, request):
-        user = request.user
-        cart = Cart.objects.filter(user=user)
-        serializer = CartSerializer(cart, many=True)
-        return Response(serializer.data)
+        with timed('serialize'):
+            data = cart_rows(request.user)
+        return Response(data)
 
+    @idempotent
     def post(self, request):
         user = User.objects.get(username=request.user)
         try:
@@ -136,51 +267,135 @@ class CartView(APIView):
         except IntegrityError:
             return Response({'error': 'This item is already in the cart'}, status=status.HTTP_400_BAD_REQUEST)
 
+class CartBatchView(APIView):
+    permission_classes = [IsAuthenticated, IsCustomer]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # the last line wins if a menu item is listed twice
+        quantities = {item['menuitem_id']: item['quantity'] for item in serializer.validated_data['items']}
+        prices = dict(MenuItem.objects.filter(id__in=quantities).values_list('id', 'price'))
+        missing = sorted(set(quantities) - set(prices))
+        if missing:
+            return Response({'error': 'Menu item not found', 'menuitem_ids': missing}, status=status.HTTP_404_NOT_FOUND)
 
-class OrderView(ListCreateAPIView):
+        removed = [menuitem_id for menuitem_id, quantity in quantities.items() if quantity == 0]
+        lines = [
+            Cart(user=request.user, menuitem_id=menuitem_id, quantity=quantity, unit_price=prices[menuitem_id])
+            for menuitem_id, quantity in quantities.items() if quantity > 0
+        ]
+        with transaction.atomic():
+            carts.claim(request.user.pk)
+            # the lines being replaced or removed, to move the cart total by the difference
+            previous = Cart.objects.filter(user=request.user, menuitem_id__in=quantities).values_list('quantity', 'unit_price')
+            subtotal = -sum((quantity * unit_price for quantity, unit_price in previous), Decimal(0))
+            item_count = -sum(quantity for quantity, _ in previous)
+            if removed:
+                with carts.settled():
+                    Cart.objects.filter(user=request.user, menuitem_id__in=removed).delete()
+            if lines:
+                Cart.objects.bulk_create(
+                    lines,
+                    update_conflicts=True,
+                    unique_fields=['user', 'menuitem'],
+                    update_fields=['quantity', 'unit_price', 'updated_at'],
+                )
+            # bulk_create sends no post_save
+            subtotal += sum((line.quantity * line.unit_price for line in lines), Decimal(0))
+            item_count += sum(line.quantity for line in lines)
+            carts.adjust(request.user.pk, subtotal, item_count)
+        return Response({'updated': len(lines), 'removed': len(removed)}, status=status.HTTP_200_OK)
+
+class CartSummaryView(APIView):
+    """
+    The cart with the customer given once instead of on every line, plus the
+    maintained subtotal and item count. ?lines=0 leaves the lines out, for a
+    cart badge that needs just the one CartTotal row.
+    """
+    permission_classes = [IsAuthenticated, IsCustomer]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+
+    def get(self, request):
+        user = request.user
+        with_lines = request.query_params.get('lines') not in ('0', 'false')
+        # one snapshot, so the lines always add up to the subtotal
+        with transaction.atomic():
+            subtotal, item_count = carts.summary(user.pk)
+            if with_lines:
+                with timed('serialize'):
+                    data = {'user': user_rows([user.pk])[user.pk], 'lines': cart_lines(user)}
+            else:
+                data = {}
+        data.update(subtotal=decimal(subtotal), item_count=item_count)
+        return Response(data)
+
+
+def visible_orders(user, roles):
+    # orders visible to user, newest first
+    if CUSTOMER in roles:
+        orders = Order.objects.filter(user=user)
+    elif MANAGER in roles:
+        orders = Order.objects.all()
+    elif DELIVERY_CREW in roles:
+        orders = Order.objects.filter(delivery_crew=user)
+    else:
+        orders = Order.objects.none()
+    return orders.order_by('-date', '-id')
+
+def order_list_queryset(user, roles):
+    # users, crews, items and menu items are loaded in a fixed number of queries
+    items = OrderItem.objects.select_related('menuitem__category')
+    return visible_orders(user, roles).select_related('user', 'delivery_crew').prefetch_related(
+        'user__groups',
+        'delivery_crew__groups',
+        Prefetch('orderitem_set', queryset=items),
+    )
+
+class OrderView(ReplicaReadMixin, ListCreateAPIView):
     permission_classes = [IsAuthenticated, (IsCustomer | IsManager | IsDeliveryCrew)]
     serializer_class = OrderSerializer
     queryset = Order.objects.all()
     throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    pagination_class = OrderPagination
+
+    def get_queryset(self):
+        return order_list_queryset(self.request.user, get_request_roles(self.request))
 
     def get(self, request):
-        user = self.request.user
-        datav= []
-        if user.groups.filter(name='customer').exists():
-            orders = Order.objects.filter(user=user)
-        elif user.groups.filter(name='manager').exists():
-            orders = Order.objects.all()
-        elif user.groups.filter(name='delivery-crew').exists():
-            orders = Order.objects.filter(delivery_crew=user)
-        for order in orders:
-            order_items = OrderItem.objects.filter(order=order)
-            order_items_serializer = OrderItemSerializer(order_items, many=True)
-            order_serializer = OrderSerializer(order)
-            data = {
-                'order': order_serializer.data,
-                'order_items': order_items_serializer.data
-            }
-            datav.append(data)
-        return Response(datav)
+        # the page is read as plain rows; rows.order_rows fetches users and items for it
+        orders = visible_orders(request.user, get_request_roles(request))
+        page = self.paginate_queryset(orders.values_list(*ORDER_FIELDS))
+        with timed('serialize'):
+            data = order_rows(page)
+        return self.get_paginated_response(data)
 
+    @idempotent
     def post(self, request):
-        user = User.objects.get(username=request.user)
-        try:
-            total = 0
-            order = Order.objects.create(user=user, total=0)
+        user = request.user
+        line_total = ExpressionWrapper(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=6, decimal_places=2))
+        with transaction.atomic():
+            # claim the cart with a write first: it takes the write lock (row locks on
+            # server databases), so a concurrent checkout waits and then finds it empty
+            if not Cart.objects.filter(user=user).update(quantity=F('quantity')):
+                return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
             cart = Cart.objects.filter(user=user)
-            for item in cart:
-                total += item.unit_price * item.quantity
-                OrderItem.objects.create(order=order, menuitem=item.menuitem, quantity=item.quantity, unit_price=item.unit_price, total=item.unit_price * item.quantity)
-
-            order.total = total
-            order.save()
-            cart.delete()
+            lines = list(cart.annotate(line_total=line_total).values('menuitem_id', 'quantity', 'unit_price', 'line_total'))
+            total = cart.aggregate(total=Sum(line_total))['total']
+            order = Order.objects.create(user=user, total=total)
+            items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, menuitem_id=line['menuitem_id'], quantity=line['quantity'], unit_price=line['unit_price'], total=line['line_total'])
+                for line in lines
+            ])
+            # bulk_create sends no post_save, so count the items for the sales rollups here
+            rollups.add_items(order.date, [(item.menuitem_id, item.quantity, item.total) for item in items])
+            with carts.settled():
+                cart.delete()
+            carts.clear(user.pk)
 
-            order_Serializer = OrderSerializer(order)
-            return Response(order_Serializer.data, status=status.HTTP_201_CREATED)
-        except Cart.DoesNotExist:
-            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+        order_Serializer = OrderSerializer(order)
+        return Response(order_Serializer.data, status=status.HTTP_201_CREATED)
 
 class OrderDetailView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsCustomer]
@@ -205,15 +420,22 @@ class OrderDetailView(RetrieveUpdateDestroyAPIView):
             if order.user != user:
                 return Response({'error': 'You are not authorized to view this order'}, status=status.HTTP_403_FORBIDDEN)
             order_items = OrderItem.objects.filter(order=order)
-            order_items_serializer = OrderItemSerializer(order_items, many=True)
-            order_serializer = OrderSerializer(order)
-            data = {
-                'order': order_serializer.data,
-                'order_items': order_items_serializer.data
-            }
+            with timed('serialize'):
+                order_items_serializer = OrderItemSerializer(order_items, many=True)
+                order_serializer = OrderSerializer(order)
+                data = {
+                    'order': order_serializer.data,
+                    'order_items': order_items_serializer.data
+                }
             return Response(data, status=status.HTTP_200_OK)
         except Order.DoesNotExist:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+            archived = archived_order_detail(pk)
+            if archived is None:
+                return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+            owner, data = archived
+            if owner != user.pk:
+                return Response({'error': 'You are not authorized to view this order'}, status=status.HTTP_403_FORBIDDEN)
+            return Response(data, status=status.HTTP_200_OK)
 
     #defs for put and patch
     def put(self, request, pk):
@@ -223,7 +445,7 @@ class OrderDetailView(RetrieveUpdateDestroyAPIView):
             if order.delivery_crew != None and order.status == True:
                 return Response({'error': 'Order has been delivered'}, status=status.HTTP_400_BAD_REQUEST)
             delivery_crew = User.objects.get(username=request.data['delivery_crew'])
-            if delivery_crew.groups.filter(name='delivery-crews').exists() == False:
+            if delivery_crew.groups.filter(name=DELIVERY_CREW).exists() == False:
                 return Response({'error': 'User is not a delivery crew'}, status=status.HTTP_400_BAD_REQUEST)
             stts = request.data['status']
             order.delivery_crew = delivery_crew
@@ -264,4 +486,121 @@ class OrderDetailView(RetrieveUpdateDestroyAPIView):
             return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class DispatchView(ReplicaReadMixin, ListCreateAPIView):
+    permission_classes = [IsAuthenticated, IsManager]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    pagination_class = OrderPagination
+    # the POST body; the browsable API builds its form from it
+    serializer_class = DispatchSerializer
+
+    def get_queryset(self):
+        return dispatch_queue()
+
+    # the queue: unassigned, undelivered orders, oldest first
+    def get(self, request):
+        page = self.paginate_queryset(self.get_queryset().values_list(*ORDER_FIELDS))
+        with timed('serialize'):
+            data = order_rows(page)
+        return self.get_paginated_response(data)
+
+    # assign the oldest `limit` queued orders, each to the crew member with the fewest open orders
+    def post(self, request):
+        serializer = DispatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        crew = User.objects.filter(groups__name=DELIVERY_CREW)
+        usernames = serializer.validated_data.get('crew')
+        if usernames:
+            crew = crew.filter(username__in=usernames)
+        crew = dict(crew.values_list('id', 'username'))
+        if usernames and len(crew) != len(set(usernames)):
+            missing = sorted(set(usernames) - set(crew.values()))
+            return Response({'error': 'User is not a delivery crew', 'usernames': missing}, status=status.HTTP_400_BAD_REQUEST)
+        if not crew:
+            return Response({'error': 'No delivery crew to assign to'}, status=status.HTTP_400_BAD_REQUEST)
+
+        assigned = assign_orders(list(crew), serializer.validated_data['limit'])
+        return Response({
+            'assigned': sum(len(ids) for ids in assigned.values()),
+            'assignments': [{'delivery_crew': crew[crew_id], 'orders': ids} for crew_id, ids in assigned.items()],
+            'queued': dispatch_queue().count(),
+        }, status=status.HTTP_200_OK)
+
+
+class SalesReportView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated, IsManager]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+
+    # answered from the daily rollups, never from Order/OrderItem
+    def get(self, request):
+        try:
+            date_from = parse_date(request.query_params['from'])
+            date_to = parse_date(request.query_params['to'])
+        except KeyError:
+            return Response({'error': 'from and to fields are required'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            return Response({'error': 'Dates must be formatted as YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        days = DailySales.objects.filter(date__range=(date_from, date_to)).order_by('date')
+        totals = days.aggregate(revenue=Sum('revenue'), order_count=Sum('order_count'), item_count=Sum('item_count'))
+        menu_items = (
+            DailyMenuItemSales.objects.filter(date__range=(date_from, date_to))
+            .values('menuitem_id', 'title')
+            .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+            .order_by('-revenue')
+        )
+        # money as 2-place strings, like every other amount in the API
+        def money(value):
+            return decimal(Decimal(value or 0).quantize(Decimal('0.01')))
+        return Response({
+            'from': date_from,
+            'to': date_to,
+            'revenue': money(totals['revenue']),
+            'order_count': totals['order_count'] or 0,
+            'item_count': totals['item_count'] or 0,
+            'days': [
+                {'date': day, 'revenue': money(revenue), 'order_count': order_count, 'item_count': item_count}
+                for day, revenue, order_count, item_count in days.values_list('date', 'revenue', 'order_count', 'item_count')
+            ],
+            'menu_items': [
+                {'menuitem_id': row['menuitem_id'], 'title': row['title'], 'quantity': row['quantity'], 'revenue': money(row['revenue'])}
+                for row in menu_items
+            ],
+        })
+
+
+class OrderExportView(APIView):
+    permission_classes = [IsAuthenticated, IsManager]
+    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    # ?type= rather than ?format=, which DRF reserves for renderer selection
+    export_types = {
+        'csv': (stream_csv, 'text/csv', 'orders.csv'),
+        'ndjson': (stream_ndjson, 'application/x-ndjson', 'orders.ndjson'),
+    }
+
+    def get(self, request):
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in self.export_types:
+            return Response({'error': 'type must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        orders = Order.objects.all()
+        try:
+            if 'from' in request.query_params:
+                orders = orders.filter(date__gte=parse_date(request.query_params['from']))
+            if 'to' in request.query_params:
+                orders = orders.filter(date__lte=parse_date(request.query_params['to']))
+        except (ValueError, TypeError):
+            return Response({'error': 'Dates must be formatted as YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        stts = request.query_params.get('status')
+        if stts is not None:
+            if stts not in ('0', '1'):
+                return Response({'error': 'status must be 0 or 1'}, status=status.HTTP_400_BAD_REQUEST)
+            orders = orders.filter(status=stts == '1')
 
+        stream, content_type, filename = self.export_types[export_type]
+        lines = stream(orders)
+        if isinstance(request._request, ASGIRequest):
+            lines = astream(lines)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response